@@ -6,39 +6,464 @@ Hook up to axosoft
 
 import requests
 import json
+import os
+import threading
+import time
+from requests.adapters import HTTPAdapter
 # pylint: disable=F0401,E0611
 try:
     from urllib.parse import urlencode
 except ImportError:
     from urllib import urlencode
-from .validate import validate_address, \
+try:
+    from ujson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+from .bulk import BulkResult, DEFAULT_CONCURRENCY, run_bulk
+from .cache import ResponseCache
+from .config import RESOURCES
+from .executor import Executor
+from .retry import RetryPolicy, TokenBucket
+from .singleflight import SingleFlight
+from .stats import RequestRecord
+from .stream import iter_array
+from .transfer import ProgressReader, replace_file
+from .validate import AuthenticationError, \
+    ServerError, \
+    validate_address, \
     validate_required_params, \
-    validate_response
+    validate_response, \
+    validate_status
 
 SUPPORTED_API_VERSIONS = set([3, 4])
 DEFAULT_API_VERSION = 4
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TOKEN_TTL = 300
+# Seconds before it expires that a token is refreshed
+DEFAULT_REFRESH_MARGIN = 300
+DEFAULT_PAGE_SIZE = 100
+# Seconds to wait to connect, and for each read, before giving up
+DEFAULT_TIMEOUT = 60
+STREAM_CHUNK_SIZE = 64 * 1024
+WARM_UP_RESOURCES = ['me', 'projects', 'picklists', 'fields', 'workflow_steps']
+
+
+def summary(address, item):
+    """
+    The fields of an item a list needs, the default columns of its resource.
+
+    Items of resources without default columns are returned unchanged.
+    """
+    columns = RESOURCES.get(address, {}).get('columns')
+    if not columns:
+        return item
+    return dict((x, item[x]) for x in columns if x in item)
 
 
 class Axosoft(object):
 
     """ Axosoft."""
 
-    def __init__(self, client_id, client_secret, domain, token=None):
-        """Init."""
+    def __init__(self, client_id, client_secret, domain, token=None,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True,
+                 token_ttl=DEFAULT_TOKEN_TTL, cache=None, decoder=None,
+                 retry=None, rate_limiter=None, scheme='https', hooks=None,
+                 refresh_token=None, token_expires=None, on_token=None,
+                 refresh_margin=DEFAULT_REFRESH_MARGIN,
+                 timeout=DEFAULT_TIMEOUT):
+        """
+        Init.
+
+        token_expires is the time the token expires at, in seconds since
+        the epoch. on_token is called with the credentials every time a new
+        token is issued, to store them. timeout is in seconds, a request
+        timing out is retried like a connection error.
+        """
         self.__consumer = {
             "client_id": client_id,
             "client_secret": client_secret,
             "domain": domain
         }
         self.__token = token
+        self.__token_ttl = token_ttl
+        # Time the token was last seen working, a stored token is trusted
+        # until the server says otherwise.
+        self.__token_checked = time.time() if token is not None else None
+        self.__refresh_token = refresh_token
+        self.__token_expires = token_expires
+        self.__refresh_margin = refresh_margin
+        self.__refreshing = threading.Lock()
+        self.__on_token = on_token
         self.__api_version = str(DEFAULT_API_VERSION)
         self.__api_path = 'api'
-        self.__base_url = 'https://{0}/{1}'\
+        self.__base_url = '{0}://{1}/{2}'\
             .format(
+                scheme,
                 self.__consumer["domain"],
                 self.__api_path
             )
         self.__content_type = 'application/x-www-form-urlencoded;charset=utf-8'
+        self.__pool_size = pool_size
+        self.__keep_alive = keep_alive
+        self.__session = None
+        self.__open_session()
+        self.__executor = Executor(pool_size)
+        self.__cache = cache
+        self.__decoder = decoder or json_loads
+        self.__retry = retry if retry is not None else RetryPolicy()
+        self.__rate_limiter = rate_limiter
+        self.__timeout = timeout
+        self.__flights = SingleFlight()
+        self.__hooks = list(hooks or [])
+
+    def __open_session(self):
+        """
+        Open a pooled session.
+
+        requests.Session is safe to share between threads for sending
+        requests, so one pool serves every caller of this client.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.__pool_size,
+            pool_maxsize=self.__pool_size
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.__keep_alive:
+            session.headers['Connection'] = 'close'
+        if self.__token is not None:
+            session.headers['Authorization'] = 'Bearer ' + self.__token
+        self.__session = session
+
+    def __set_token(self, token):
+        """ Store the token and use it for every following request. """
+        self.__token = token
+        if token is None:
+            self.__token_checked = None
+            self.__session.headers.pop('Authorization', None)
+        else:
+            self.__token_checked = time.time()
+            self.__session.headers['Authorization'] = 'Bearer ' + token
+
+    def __store_auth(self, auth):
+        """ Use the token of an OAuth response and hand it to on_token. """
+        assert auth['token_type'] == 'bearer'
+        # The refresh token is only replaced when a new one is issued
+        if auth.get('refresh_token'):
+            self.__refresh_token = auth['refresh_token']
+        expires_in = auth.get('expires_in')
+        self.__token_expires = time.time() + float(expires_in) \
+            if expires_in else None
+        self.__set_token(auth['access_token'])
+        if self.__on_token is not None:
+            self.__on_token(self.credentials())
+        return self.__token
+
+    def credentials(self):
+        """ The token, refresh token and expiry, for storing. """
+        return {
+            'access_token': self.__token,
+            'refresh_token': self.__refresh_token,
+            'expires': self.__token_expires
+        }
+
+    def refresh(self, token=None):
+        """
+        Exchange the refresh token for a new token.
+
+        Refreshes are serialised, token is the token the caller wants
+        replaced. When another caller already replaced it while this one
+        waited, the new token is returned without another refresh.
+        Raises AuthenticationError when there is no refresh token or it
+        was rejected.
+        """
+        with self.__refreshing:
+            if (token is not None and self.__token is not None
+                    and token != self.__token):
+                return self.__token
+            if self.__refresh_token is None:
+                raise AuthenticationError('There is no refresh token')
+
+            try:
+                auth = self.__request(
+                    'POST',
+                    '%s/oauth2/token' % self.__base_url,
+                    200,
+                    'oauth2/token',
+                    data={
+                        'grant_type': 'refresh_token',
+                        'client_id': self.__consumer['client_id'],
+                        'client_secret': self.__consumer['client_secret'],
+                        'refresh_token': self.__refresh_token
+                    }
+                )[1]
+            except AuthenticationError as error:
+                # Expired or revoked, only a new authentication helps.
+                # Anything else may be transient, the token is kept.
+                self.__refresh_token = None
+                self.__token_expires = None
+                self.__set_token(None)
+                if self.__on_token is not None:
+                    self.__on_token(self.credentials())
+                raise AuthenticationError(
+                    'The refresh token was rejected: {0}'.format(error)
+                )
+            return self.__store_auth(auth)
+
+    def refresh_delay(self):
+        """ Seconds until the token is due a refresh, None if never. """
+        if self.__refresh_token is None or self.__token_expires is None:
+            return None
+        return max(
+            0.0,
+            self.__token_expires - self.__refresh_margin - time.time()
+        )
+
+    def refresh_if_due(self):
+        """
+        Refresh the token if it is about to expire.
+
+        Requests call this first, so a token is refreshed by one of them
+        while the others wait for it instead of all being rejected. A
+        failed refresh is ignored while the old token has not expired yet.
+        """
+        delay = self.refresh_delay()
+        if delay is None or delay > 0:
+            return False
+        token = self.__token
+        try:
+            self.refresh(token)
+        except (requests.ConnectionError, requests.Timeout, ServerError):
+            if time.time() >= self.__token_expires:
+                raise
+            return False
+        return True
+
+    def __decode(self, response):
+        """ Decode a JSON body, every body is decoded exactly once. """
+        return self.__decoder(response.text)
+
+    def __send(self, verb, uri, record, **kwargs):
+        """
+        Send a request, retrying transient failures.
+
+        Every attempt first takes a token from the rate limiter, if any.
+        Retries, status and time to first byte are noted in record.
+        """
+        if record.resource != 'oauth2/token':
+            self.refresh_if_due()
+        # A hung connection would hold on to its worker for good
+        kwargs.setdefault('timeout', self.__timeout)
+
+        attempt = 0
+        while True:
+            if self.__rate_limiter is not None:
+                self.__rate_limiter.acquire()
+
+            try:
+                response = self.__session.request(verb, uri, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self.__retry.should_retry(verb, attempt):
+                    raise
+                response = None
+            else:
+                record.status = response.status_code
+                record.ttfb = response.elapsed.total_seconds()
+                if not self.__retry.should_retry(verb, attempt, response):
+                    return response
+                response.close()
+
+            time.sleep(self.__retry.delay(attempt, response))
+            attempt += 1
+            record.retries += 1
+
+    def __record(self, verb, address, cache=None, data=None):
+        """ Start the record of a request. """
+        if isinstance(data, dict):
+            data = urlencode(data)
+        return RequestRecord(
+            verb,
+            address,
+            bytes_out=len(data or ''),
+            cache=cache
+        )
+
+    def __notify(self, record):
+        """ Hand a finished record to every hook. """
+        if record.total is None:
+            record.total = time.time() - record.started
+        # pylint: disable=W0703
+        for hook in self.__hooks:
+            try:
+                hook(record)
+            except Exception:
+                # A broken hook must not break requests
+                pass
+
+    def __request(self, verb, uri, expected_code, address, cache=None,
+                  **kwargs):
+        """
+        Send a request and validate the response.
+
+        A request rejected for its token is sent once more after the token
+        was refreshed, unless its body is a stream that was already read.
+        """
+        token = self.__token
+        try:
+            return self.__attempt(
+                verb,
+                uri,
+                expected_code,
+                address,
+                cache,
+                **kwargs
+            )
+        except AuthenticationError:
+            if (self.__refresh_token is None
+                    or address == 'oauth2/token'
+                    or hasattr(kwargs.get('data'), 'read')):
+                raise
+
+        self.refresh(token)
+        return self.__attempt(
+            verb,
+            uri,
+            expected_code,
+            address,
+            cache,
+            **kwargs
+        )
+
+    def __attempt(self, verb, uri, expected_code, address, cache=None,
+                  **kwargs):
+        """
+        Send a request and validate the response.
+
+        Returns the response and its decoded body. A rejected token is
+        forgotten so the next is_authenticated call reports it without
+        another round trip. cache is the cache state of a GET for hooks.
+        """
+        record = self.__record(verb, address, cache, kwargs.get('data'))
+        try:
+            response = self.__send(verb, uri, record, **kwargs)
+            record.bytes_in = len(response.content)
+            if response.status_code == 304 and kwargs.get('headers'):
+                # A conditional GET, the caller already has the body.
+                record.cache = 'revalidated'
+                data = None
+            else:
+                data = self.__check(response, expected_code)
+        except Exception as error:
+            record.error = error.__class__.__name__
+            raise
+        finally:
+            self.__notify(record)
+
+        if self.__token is not None:
+            self.__token_checked = time.time()
+
+        return response, data
+
+    def __check(self, response, expected_code):
+        """
+        Validate a response and return its decoded body.
+
+        Busy and failing servers are told apart by status first, a body
+        that isn't JSON must not turn them into a rejected request.
+        """
+        validate_status(response)
+        data = self.__decode(response)
+        self.__validate(response, expected_code, data)
+        return data
+
+    def __validate(self, response, expected_code, data):
+        """
+        Validate a response, forgetting the token if it was rejected.
+
+        on_token is told as well, so a stored copy of the token is dropped
+        and not trusted again by the next client.
+        """
+        try:
+            validate_response(response, expected_code, data)
+        except AuthenticationError:
+            # Unless it was already replaced by a refresh
+            sent = response.request.headers.get('Authorization')
+            if (self.__token is not None
+                    and sent == 'Bearer ' + self.__token):
+                self.__set_token(None)
+                if self.__on_token is not None:
+                    self.__on_token(self.credentials())
+            raise
+
+    def __uri(self, resource, resource_id=None, element=None):
+        """ Build the URI of a resource. """
+        uri = '{0}/v{1}/{2}'\
+            .format(
+                self.__base_url,
+                self.__api_version,
+                resource['address']
+            )
+
+        if resource_id is not None:
+            uri = '{0}/{1}'.format(uri, resource_id)
+
+        if element is not None:
+            uri = '{0}/{1}'.format(uri, element)
+
+        return uri
+
+    @staticmethod
+    def __project(resource, payload, columns):
+        """
+        Add a column projection to the query parameters.
+
+        columns may be a list of field names, or True for the default
+        projection of the resource.
+        """
+        if columns is True:
+            columns = resource.get('columns')
+        if not columns:
+            return payload
+        payload = dict(payload or {})
+        payload['columns'] = ','.join(columns)
+        return payload
+
+    def close(self):
+        """
+        Close every pooled connection and stop the worker threads.
+
+        Workers stop once the jobs already queued are done, the client starts
+        new ones if it is used again.
+        """
+        self.__session.close()
+        self.__executor.shutdown()
+
+    def cache(self):
+        """ The response cache, None unless one was given. """
+        return self.__cache
+
+    def add_hook(self, hook):
+        """
+        Call hook with a RequestRecord after every request.
+
+        Hooks run on the thread that made the request and must be thread
+        safe, their exceptions are ignored.
+        """
+        self.__hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """ Stop calling a hook. """
+        self.__hooks.remove(hook)
+
+    def coalescing_stats(self):
+        """ Counts of GETs and of GETs that shared an identical one. """
+        return self.__flights.stats()
+
+    def __invalidate(self, address):
+        """ Forget cached responses of an address after it changed. """
+        if self.__cache is not None:
+            self.__cache.invalidate(address)
 
     def set_api_version(self, api_version):
         """
@@ -47,17 +472,31 @@ class Axosoft(object):
         If default API version is not sufficient it may be changed.
         """
         if api_version in SUPPORTED_API_VERSIONS:
-            self.__api_version = str(DEFAULT_API_VERSION)
+            self.__api_version = str(api_version)
         else:
             raise LookupError(
-                'The version of the Axosoft API you are trying \
-                to use is not supported'
+                'The version of the Axosoft API you are trying '
+                'to use is not supported'
             )
 
     def is_authenticated(self):
-        """ Test if there is a valid token."""
-        if self.__token is None:
+        """
+        Test if there is a valid token.
+
+        The token is only checked against the API once it has gone unused
+        for longer than the token TTL.
+        """
+        if self.__token is None and self.__refresh_token is not None:
+            try:
+                self.refresh()
+            except AuthenticationError:
+                authenticated = False
+            else:
+                authenticated = True
+        elif self.__token is None:
             authenticated = False
+        elif time.time() - self.__token_checked < self.__token_ttl:
+            authenticated = True
         else:
             try:
                 self.get('me')
@@ -88,13 +527,14 @@ class Axosoft(object):
                 'password': password,
                 'scope': scope
             }
-            response = requests.post(uri, payload)
-            success = validate_response(response, 200)
-            if success:
-                auth = response.json()
-                assert auth['token_type'] == 'bearer'
-                self.__token = auth['access_token']
-                return self.__token
+            auth = self.__request(
+                'POST',
+                uri,
+                200,
+                'oauth2/token',
+                data=payload
+            )[1]
+            return self.__store_auth(auth)
 
     def begin_authentication_by_code(self, redirect_uri, scope="read write"):
         """ Return the URL to use when authenticating with the code method. """
@@ -114,139 +554,447 @@ class Axosoft(object):
         """
         Authenticate.
 
-        Get a new token if one doesn't exist.
-        Otherwise return the existing token.
+        Always exchange the code for a new token. The user only goes
+        through the code flow when the current token is no good, even if
+        it hasn't been rejected yet.
         """
-        authenticated = self.is_authenticated()
-        if authenticated:
-            return self.__token
-        else:
-            uri = '%s/oauth2/token' % self.__base_url
-            payload = {
-                'grant_type': 'authorization_code',
-                'client_id': self.__consumer['client_id'],
-                'client_secret': self.__consumer['client_secret'],
-                'code': code,
-                'redirect_uri': redirect_uri
-            }
-            response = requests.post(uri, payload)
-            success = validate_response(response, 200)
-            if success:
-                auth = response.json()
-                assert auth['token_type'] == 'bearer'
-                self.__token = auth['access_token']
-                return self.__token
+        uri = '%s/oauth2/token' % self.__base_url
+        payload = {
+            'grant_type': 'authorization_code',
+            'client_id': self.__consumer['client_id'],
+            'client_secret': self.__consumer['client_secret'],
+            'code': code,
+            'redirect_uri': redirect_uri
+        }
+        auth = self.__request(
+            'POST',
+            uri,
+            200,
+            'oauth2/token',
+            data=payload
+        )[1]
+        return self.__store_auth(auth)
 
     def log_out(self):
-        """ Log out of the API. """
+        """
+        Log out of the API.
+
+        The response cache is cleared, it holds what this user was allowed
+        to see.
+        """
+        if self.__cache is not None:
+            self.__cache.clear()
         self.__token = None
+        self.__token_checked = None
+        self.__refresh_token = None
+        self.__token_expires = None
+        self.close()
+        self.__open_session()
         return True
 
-    def get(self, address, resourse_id=None, payload=None, element=None):
-        """ Get a resource. """
+    def get(self, address, resourse_id=None, payload=None, element=None,
+            columns=None):
+        """
+        Get a resource.
+
+        columns limits the fields returned, either a list of field names
+        or True for the default columns of the resource.
+        """
         resource = validate_address(address, 'GET', element)
-        uri = '{0}/v{1}/{2}'\
-            .format(
-                self.__base_url,
-                self.__api_version,
-                resource['address']
-            )
+        uri = self.__uri(resource, resourse_id, element)
+        payload = self.__project(resource, payload, columns)
+        key = ResponseCache.key(address, resourse_id, element, payload)
+
+        if self.__cache is not None:
+            entry = self.__cache.get(key)
+            if entry is not None and entry.fresh():
+                if self.__hooks:
+                    self.__notify(self.__record('GET', address, 'hit'))
+                return entry.data
+
+        # Identical GETs already in flight share the one request
+        return self.__flights.do(
+            key,
+            self.__fetch,
+            key,
+            resource,
+            uri,
+            payload
+        )
 
-        if resourse_id is not None:
-            uri = '{0}/{1}'.format(uri, resourse_id)
-        else:
-            pass
+    def __fetch(self, key, resource, uri, payload):
+        """ Send a GET, revalidating the cached response if there is one. """
+        if self.__cache is None:
+            return self.__request(
+                'GET',
+                uri,
+                200,
+                resource['address'],
+                params=payload
+            )[1]
 
-        if element is not None:
-            uri = '{0}/{1}'.format(uri, element)
-        else:
-            pass
+        entry = self.__cache.get(key)
+        headers = {}
+        if entry is not None:
+            headers = entry.conditional_headers()
 
-        response = requests.get(
+        response, data = self.__request(
+            'GET',
             uri,
+            200,
+            resource['address'],
+            'miss',
             params=payload,
-            headers={'Authorization': 'Bearer ' + self.__token}
+            headers=headers
         )
 
-        validate_response(response, 200)
+        if response.status_code == 304:
+            entry.touch()
+        else:
+            entry = self.__cache.put(key, resource, response, data)
 
-        response = response.json()
+        return entry.data
 
-        return response
+    def create(self, address, payload, resource_id=None, element=None,
+               idempotency_key=None):
+        """
+        Create a resource.
 
-    def create(self, address, payload, resource_id=None, element=None):
-        """ Create a resource. """
+        idempotency_key is sent as an Idempotency-Key header, so a request
+        replayed after an uncertain failure can be recognised.
+        """
         resource = validate_address(address, 'POST', element)
 
-        uri = '{0}/v{1}/{2}'\
-            .format(
-                self.__base_url,
-                self.__api_version,
-                resource['address']
-            )
+        uri = self.__uri(resource)
 
         if element is None:
             validate_required_params(resource, payload)
         else:
             uri = '{0}/{1}/{2}'.format(uri, resource_id, element)
 
-        headers = {
-            'Content-type': 'application/json; charset=utf-8',
-            'Authorization': 'Bearer ' + self.__token
-        }
-        response = requests.post(
+        headers = {'Content-type': 'application/json; charset=utf-8'}
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
+        data = self.__request(
+            'POST',
             uri,
+            201,
+            address,
             data=json.dumps(payload),
             headers=headers
-        )
+        )[1]
 
-        validate_response(response, 201)
+        self.__invalidate(address)
 
-        data = response.json()
         return data
 
-    def update(self, address, resourse_id, payload):
+    def update(self, address, resourse_id, payload, idempotency_key=None):
         """ Update a resource. """
         resource = validate_address(address, 'POST')
 
-        uri = '{0}/v{1}/{2}/{3}'\
-            .format(
-                self.__base_url,
-                self.__api_version,
-                resource['address'],
-                resourse_id
-            )
+        uri = self.__uri(resource, resourse_id)
 
-        headers = {
-            'Content-type': 'application/json; charset=utf-8',
-            'Authorization': 'Bearer ' + self.__token
-        }
-        response = requests.post(
+        headers = {'Content-type': 'application/json; charset=utf-8'}
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
+        data = self.__request(
+            'POST',
             uri,
+            200,
+            address,
             data=json.dumps(payload),
             headers=headers
-        )
+        )[1]
 
-        validate_response(response, 200)
+        self.__invalidate(address)
 
-        data = response.json()
         return data
 
-    def delete(self, address, resourse_id):
+    def delete(self, address, resourse_id, idempotency_key=None):
         """ Delete a resource. """
         resource = validate_address(address, 'DELETE')
 
-        uri = '{0}/v{1}/{2}/{3}'\
-            .format(
-                self.__base_url,
-                self.__api_version,
-                resource['address'],
-                resourse_id
+        uri = self.__uri(resource, resourse_id)
+
+        headers = {}
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
+        self.__request('DELETE', uri, 200, address, headers=headers)
+
+        self.__invalidate(address)
+
+        return True
+
+    def warm_up(self, addresses=None):
+        """
+        Open connections and prefetch reference data in parallel.
+
+        Each address is fetched with its default columns, the same way the
+        plugin lists it, so a response cache is left holding what the first
+        commands will ask for. Returns a BulkResult per address, nothing is
+        fetched without a token.
+        """
+        if self.__token is None:
+            return []
+        addresses = addresses or WARM_UP_RESOURCES
+        return run_bulk(
+            self.__executor,
+            lambda address: self.get(address, columns=True),
+            [(address, (address,)) for address in addresses],
+            len(addresses)
+        )
+
+    def bulk_create(self, address, payloads,
+                    concurrency=DEFAULT_CONCURRENCY):
+        """
+        Create many resources concurrently.
+
+        Returns a BulkResult per payload, failures don't stop the batch.
+        """
+        return run_bulk(
+            self.__executor,
+            self.create,
+            [(None, (address, payload)) for payload in payloads],
+            concurrency
+        )
+
+    def bulk_update(self, address, updates, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Update many resources from (id, payload) pairs concurrently.
+
+        Returns a BulkResult per pair, failures don't stop the batch.
+        """
+        return run_bulk(
+            self.__executor,
+            self.update,
+            [
+                (resource_id, (address, resource_id, payload))
+                for resource_id, payload in updates
+            ],
+            concurrency
+        )
+
+    def bulk_delete(self, address, resource_ids,
+                    concurrency=DEFAULT_CONCURRENCY):
+        """
+        Delete many resources concurrently.
+
+        Returns a BulkResult per id, failures don't stop the batch.
+        """
+        return run_bulk(
+            self.__executor,
+            self.delete,
+            [
+                (resource_id, (address, resource_id))
+                for resource_id in resource_ids
+            ],
+            concurrency
+        )
+
+    def iter_pages(self, address, payload=None, page_size=DEFAULT_PAGE_SIZE,
+                   prefetch=True, columns=None):
+        """
+        Yield the data of a list resource one page at a time.
+
+        With prefetch the next page is requested in the background while
+        the caller works through the current one.
+        """
+        payload = dict(payload or {})
+        payload['page_size'] = page_size
+        payload['page'] = 1
+
+        def fetch():
+            """ Get the current page. """
+            return self.get(address, None, dict(payload), columns=columns)
+
+        response = fetch()
+        while True:
+            data = response['data']
+            metadata = response.get('metadata', {})
+
+            if 'total_pages' in metadata:
+                more = payload['page'] < metadata['total_pages']
+            else:
+                more = len(data) == page_size
+
+            following = None
+            if more:
+                payload['page'] += 1
+                if prefetch:
+                    following = self.__executor.submit(
+                        self.get,
+                        address,
+                        None,
+                        dict(payload),
+                        columns=columns
+                    )
+
+            yield data
+
+            if not more:
+                break
+            elif following is not None:
+                response = following.result()
+            else:
+                response = fetch()
+
+    def iter_all(self, address, payload=None, page_size=DEFAULT_PAGE_SIZE,
+                 prefetch=True, columns=None):
+        """ Yield every item of a list resource, page by page. """
+        for data in self.iter_pages(address, payload, page_size, prefetch,
+                                    columns):
+            for item in data:
+                yield item
+
+    def iter_stream(self, address, payload=None, columns=None,
+                    chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yield the items of a list response while its body arrives.
+
+        Only one item at a time is decoded and held in memory, so very large
+        responses can be processed without reading them whole.
+        """
+        resource = validate_address(address, 'GET')
+        uri = self.__uri(resource)
+        payload = self.__project(resource, payload, columns)
+
+        record = self.__record('GET', address)
+
+        def chunks(response):
+            """ Count the bytes of the body as they arrive. """
+            for chunk in response.iter_content(chunk_size):
+                record.bytes_in += len(chunk)
+                yield chunk
+
+        response = None
+        try:
+            response = self.__send(
+                'GET',
+                uri,
+                record,
+                params=payload,
+                stream=True
             )
+            if response.status_code != 200:
+                # Errors are small, read and report them as usual
+                record.bytes_in = len(response.content)
+                self.__check(response, 200)
+
+            if self.__token is not None:
+                self.__token_checked = time.time()
+
+            for item in iter_array(chunks(response)):
+                yield item
+        except Exception as error:
+            record.error = error.__class__.__name__
+            raise
+        finally:
+            if response is not None:
+                response.close()
+            self.__notify(record)
+
+    def upload_attachment(self, address, resource_id, path, file_name=None,
+                          on_progress=None):
+        """
+        Attach a file on disk to a resource, such as a defect.
+
+        The file is sent in chunks as it is read, so memory use does not
+        grow with its size. on_progress is called with the bytes sent so far
+        and the size of the file.
+        """
+        resource = validate_address(address, 'POST', 'attachments')
+        uri = self.__uri(resource, resource_id, 'attachments')
+
+        with open(path, 'rb') as upload:
+            data = self.__request(
+                'POST',
+                uri,
+                201,
+                address,
+                params={'file_name': file_name or os.path.basename(path)},
+                data=ProgressReader(
+                    upload,
+                    os.path.getsize(path),
+                    on_progress
+                ),
+                headers={'Content-type': 'application/octet-stream'}
+            )[1]
+
+        self.__invalidate(address)
 
-        headers = {'Authorization': 'Bearer ' + self.__token}
+        return data
 
-        response = requests.delete(uri, headers=headers)
+    def download_attachment(self, attachment_id, path, on_progress=None,
+                            chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Save the data of an attachment to path.
 
-        success = validate_response(response, 200)
-        return success
+        The body is written to path.part as it arrives, which is renamed to
+        path once complete. A part file left by an interrupted download is
+        resumed with a Range request, as is a connection lost mid transfer
+        while retries remain. on_progress is called with the bytes written
+        so far and the total size, None if the server didn't send it.
+        """
+        resource = validate_address('attachments', 'GET', 'data')
+        uri = self.__uri(resource, attachment_id, 'data')
+        part_path = '{0}.part'.format(path)
+        record = self.__record('GET', 'attachments/data')
+
+        try:
+            while True:
+                done = 0
+                headers = {}
+                if os.path.exists(part_path):
+                    done = os.path.getsize(part_path)
+                    headers['Range'] = 'bytes={0}-'.format(done)
+
+                response = self.__send(
+                    'GET',
+                    uri,
+                    record,
+                    headers=headers,
+                    stream=True
+                )
+                try:
+                    if response.status_code == 416:
+                        # The part file doesn't belong to this attachment
+                        os.remove(part_path)
+                        continue
+                    elif response.status_code not in (200, 206):
+                        record.bytes_in += len(response.content)
+                        self.__check(response, 200)
+                    elif response.status_code == 200:
+                        # The whole body, the server ignored the Range
+                        done = 0
+
+                    total = response.headers.get('Content-Length')
+                    total = int(total) + done if total else None
+                    with open(part_path, 'ab' if done else 'wb') as part:
+                        for chunk in response.iter_content(chunk_size):
+                            part.write(chunk)
+                            done += len(chunk)
+                            record.bytes_in += len(chunk)
+                            if on_progress is not None:
+                                on_progress(done, total)
+                except (requests.ConnectionError,
+                        requests.exceptions.ChunkedEncodingError):
+                    if not self.__retry.should_retry('GET', record.retries):
+                        raise
+                    time.sleep(self.__retry.delay(record.retries))
+                    record.retries += 1
+                    continue
+                finally:
+                    response.close()
+                break
+
+            replace_file(part_path, path)
+        except Exception as error:
+            record.error = error.__class__.__name__
+            raise
+        finally:
+            self.__notify(record)
+
+        if self.__token is not None:
+            self.__token_checked = time.time()
+
+        return path
@@ -0,0 +1,340 @@
+"""
+Aio.
+
+An asyncio variant of the Axosoft client for concurrent workloads.
+
+This module needs Python 3.5+ and aiohttp. It is not imported by the
+package, which must keep working on the Python 3.3 bundled with Sublime
+Text 3, import it explicitly with `from axosoft_api.aio import AsyncAxosoft`.
+"""
+import asyncio
+import json
+import time
+# pylint: disable=F0401,E0611
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+try:
+    from ujson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+from . import DEFAULT_API_VERSION, \
+    DEFAULT_POOL_SIZE, \
+    DEFAULT_TIMEOUT, \
+    DEFAULT_TOKEN_TTL, \
+    SUPPORTED_API_VERSIONS
+from .retry import RetryPolicy
+from .validate import AuthenticationError, \
+    validate_address, \
+    validate_required_params, \
+    validate_response, \
+    validate_status
+
+DEFAULT_CONCURRENCY = 10
+
+
+class _Response(object):
+
+    """ The parts of a response validate_response and RetryPolicy read."""
+
+    def __init__(self, response, text):
+        """ Init. """
+        self.status_code = response.status
+        self.headers = response.headers
+        self.text = text
+
+    def json(self):
+        """ Decode the body. """
+        return json.loads(self.text)
+
+
+class AsyncAxosoft(object):
+
+    """
+    Axosoft on asyncio.
+
+    Has the surface of Axosoft with coroutines in place of blocking calls.
+    Connections are pooled per client and no more than concurrency
+    requests are in flight at once, so fan-outs such as
+
+        await asyncio.gather(*[client.get(x) for x in item_types])
+
+    can be as wide as needed. Create and use a client inside the event loop
+    it will run on and close it when done, or use it with async with.
+    """
+
+    def __init__(self, client_id, client_secret, domain, token=None,
+                 pool_size=DEFAULT_POOL_SIZE, concurrency=DEFAULT_CONCURRENCY,
+                 keep_alive=True, token_ttl=DEFAULT_TOKEN_TTL, decoder=None,
+                 retry=None, timeout=DEFAULT_TIMEOUT, scheme='https'):
+        """ Init. """
+        if aiohttp is None:
+            raise ImportError('aiohttp is not available')
+        self.__consumer = {
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "domain": domain
+        }
+        self.__token = token
+        self.__token_ttl = token_ttl
+        self.__token_checked = time.time() if token is not None else None
+        self.__api_version = str(DEFAULT_API_VERSION)
+        self.__base_url = '{0}://{1}/api'.format(scheme, domain)
+        self.__pool_size = pool_size
+        self.__keep_alive = keep_alive
+        self.__concurrency = concurrency
+        self.__semaphore = None
+        self.__session = None
+        self.__decoder = decoder or json_loads
+        self.__retry = retry if retry is not None else RetryPolicy()
+        self.__timeout = timeout
+
+    async def __aenter__(self):
+        """ Enter. """
+        return self
+
+    async def __aexit__(self, *args):
+        """ Close the pool on the way out. """
+        await self.close()
+
+    def __open_session(self):
+        """ The pooled session, opened on first use inside the loop. """
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.__pool_size,
+                force_close=not self.__keep_alive
+            )
+            self.__session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.__timeout)
+            )
+            self.__semaphore = asyncio.Semaphore(self.__concurrency)
+        return self.__session
+
+    async def close(self):
+        """ Close every pooled connection. """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    def __set_token(self, token):
+        """ Store the token and use it for every following request. """
+        self.__token = token
+        self.__token_checked = time.time() if token is not None else None
+
+    async def __send(self, verb, uri, **kwargs):
+        """
+        Send a request within the concurrency limit, retrying transient
+        failures the way the blocking client does.
+        """
+        session = self.__open_session()
+        headers = dict(kwargs.pop('headers', None) or {})
+        if self.__token is not None:
+            headers['Authorization'] = 'Bearer ' + self.__token
+
+        attempt = 0
+        while True:
+            try:
+                async with self.__semaphore:
+                    async with session.request(verb, uri, headers=headers,
+                                               **kwargs) as raw:
+                        body = await raw.read()
+                        response = _Response(
+                            raw,
+                            body.decode(raw.charset or 'utf-8')
+                        )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not self.__retry.should_retry(verb, attempt):
+                    raise
+                response = None
+            else:
+                if not self.__retry.should_retry(verb, attempt, response):
+                    return response
+
+            # Wait outside the semaphore so others can use the slot
+            await asyncio.sleep(self.__retry.delay(attempt, response))
+            attempt += 1
+
+    async def __request(self, verb, uri, expected_code, **kwargs):
+        """ Send a request, returns its validated and decoded body. """
+        response = await self.__send(verb, uri, **kwargs)
+        validate_status(response)
+        data = self.__decoder(response.text)
+        try:
+            validate_response(response, expected_code, data)
+        except AuthenticationError:
+            self.__set_token(None)
+            raise
+
+        if self.__token is not None:
+            self.__token_checked = time.time()
+
+        return data
+
+    def __uri(self, resource, resource_id=None, element=None):
+        """ Build the URI of a resource. """
+        uri = '{0}/v{1}/{2}'.format(
+            self.__base_url,
+            self.__api_version,
+            resource['address']
+        )
+        if resource_id is not None:
+            uri = '{0}/{1}'.format(uri, resource_id)
+        if element is not None:
+            uri = '{0}/{1}'.format(uri, element)
+        return uri
+
+    @staticmethod
+    def __params(resource, payload, columns):
+        """ Query parameters, with the column projection if any. """
+        if columns is True:
+            columns = resource.get('columns')
+        params = dict(payload or {})
+        if columns:
+            params['columns'] = ','.join(columns)
+        # aiohttp only takes strings and numbers, requests leaves out None
+        return dict(
+            (key, '{0}'.format(value) if isinstance(value, bool) else value)
+            for key, value in params.items()
+            if value is not None
+        )
+
+    def set_api_version(self, api_version):
+        """ Set API Version. """
+        if api_version in SUPPORTED_API_VERSIONS:
+            self.__api_version = str(api_version)
+        else:
+            raise LookupError(
+                'The version of the Axosoft API you are trying '
+                'to use is not supported'
+            )
+
+    async def is_authenticated(self):
+        """
+        Test if there is a valid token.
+
+        The token is only checked against the API once it has gone unused
+        for longer than the token TTL.
+        """
+        if self.__token is None:
+            return False
+        elif time.time() - self.__token_checked < self.__token_ttl:
+            return True
+        try:
+            await self.get('me')
+        except ValueError:
+            return False
+        return True
+
+    async def __authenticate(self, payload):
+        """ Exchange credentials for a token. """
+        auth = await self.__request(
+            'POST',
+            '{0}/oauth2/token'.format(self.__base_url),
+            200,
+            data=payload
+        )
+        assert auth['token_type'] == 'bearer'
+        self.__set_token(auth['access_token'])
+        return self.__token
+
+    async def authenticate_by_password(self, user, password,
+                                       scope="read write"):
+        """ Get a new token if the current one isn't valid. """
+        if await self.is_authenticated():
+            return self.__token
+        return await self.__authenticate({
+            'grant_type': 'password',
+            'client_id': self.__consumer['client_id'],
+            'client_secret': self.__consumer['client_secret'],
+            'username': user,
+            'password': password,
+            'scope': scope
+        })
+
+    def begin_authentication_by_code(self, redirect_uri, scope="read write"):
+        """ Return the URL to use when authenticating with the code method. """
+        payload = {
+            "response_type": "code",
+            "client_id": self.__consumer['client_id'],
+            "redirect_uri": redirect_uri,
+            "scope": scope
+        }
+        return "https://{0}/auth?{1}".format(
+            self.__consumer["domain"],
+            urlencode(payload)
+        )
+
+    async def complete_authentication_by_code(self, code, redirect_uri):
+        """ Always exchange the code for a new token. """
+        return await self.__authenticate({
+            'grant_type': 'authorization_code',
+            'client_id': self.__consumer['client_id'],
+            'client_secret': self.__consumer['client_secret'],
+            'code': code,
+            'redirect_uri': redirect_uri
+        })
+
+    async def log_out(self):
+        """ Log out of the API. """
+        self.__set_token(None)
+        await self.close()
+        return True
+
+    async def get(self, address, resourse_id=None, payload=None,
+                  element=None, columns=None):
+        """
+        Get a resource.
+
+        columns limits the fields returned, either a list of field names
+        or True for the default columns of the resource.
+        """
+        resource = validate_address(address, 'GET', element)
+        return await self.__request(
+            'GET',
+            self.__uri(resource, resourse_id, element),
+            200,
+            params=self.__params(resource, payload, columns)
+        )
+
+    async def create(self, address, payload, resource_id=None, element=None):
+        """ Create a resource. """
+        resource = validate_address(address, 'POST', element)
+        if element is None:
+            validate_required_params(resource, payload)
+            uri = self.__uri(resource)
+        else:
+            uri = self.__uri(resource, resource_id, element)
+        return await self.__request(
+            'POST',
+            uri,
+            201,
+            data=json.dumps(payload),
+            headers={'Content-type': 'application/json; charset=utf-8'}
+        )
+
+    async def update(self, address, resourse_id, payload):
+        """ Update a resource. """
+        resource = validate_address(address, 'POST')
+        return await self.__request(
+            'POST',
+            self.__uri(resource, resourse_id),
+            200,
+            data=json.dumps(payload),
+            headers={'Content-type': 'application/json; charset=utf-8'}
+        )
+
+    async def delete(self, address, resourse_id):
+        """ Delete a resource. """
+        resource = validate_address(address, 'DELETE')
+        await self.__request(
+            'DELETE',
+            self.__uri(resource, resourse_id),
+            200
+        )
+        return True
@@ -0,0 +1,87 @@
+"""
+Bulk.
+
+Run many requests concurrently and collect every outcome.
+"""
+import threading
+
+DEFAULT_CONCURRENCY = 4
+
+
+class BulkResult(object):
+
+    """ The outcome of one request in a batch."""
+
+    def __init__(self, resource_id, data=None, error=None):
+        """ Init. """
+        self.resource_id = resource_id
+        self.data = data
+        self.error = error
+
+    @property
+    def success(self):
+        """ Test if the request succeeded. """
+        return self.error is None
+
+    def __repr__(self):
+        """ Repr. """
+        return 'BulkResult({0!r}, success={1})'.format(
+            self.resource_id,
+            self.success
+        )
+
+
+def run_bulk(executor, func, calls, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Call func once per (resource_id, args) pair in calls.
+
+    No more than concurrency calls are on the executor at once, the next
+    call is submitted as one finishes, so a large batch doesn't queue up
+    ahead of everything else using the executor. A failing call is
+    recorded in its BulkResult and does not stop the others, results are
+    returned in the order of calls.
+    """
+    calls = list(calls)
+    results = [None] * len(calls)
+    lock = threading.Lock()
+    finished = threading.Event()
+    state = {'submitted': 0, 'done': 0}
+
+    def finish(index, result):
+        """ Record a result and submit the next call, on a worker. """
+        results[index] = result
+        with lock:
+            state['done'] += 1
+            done = state['done'] == len(calls)
+        if done:
+            finished.set()
+        else:
+            submit()
+
+    def submit():
+        """ Submit the next call, if any is left. """
+        with lock:
+            index = state['submitted']
+            if index >= len(calls):
+                return
+            state['submitted'] += 1
+        resource_id, args = calls[index]
+        executor.submit(
+            func,
+            *args,
+            on_done=lambda data: finish(
+                index,
+                BulkResult(resource_id, data=data)
+            ),
+            on_error=lambda error: finish(
+                index,
+                BulkResult(resource_id, error=error)
+            )
+        )
+
+    if not calls:
+        return []
+    for _ in range(max(1, min(concurrency, len(calls)))):
+        submit()
+    finished.wait()
+    return results
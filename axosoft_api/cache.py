@@ -0,0 +1,158 @@
+"""
+Cache.
+
+Size bounded LRU caches for API responses.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_TTL = 60
+
+
+class LRUCache(object):
+
+    """ A thread safe LRU cache bounded by the total size of its values."""
+
+    def __init__(self, max_size):
+        """ Init. """
+        self.__max_size = max_size
+        self.__size = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        """ Number of cached values. """
+        return len(self.__entries)
+
+    def size(self):
+        """ Total size of the cached values. """
+        return self.__size
+
+    def get(self, key, default=None):
+        """ Get a value and mark it as recently used. """
+        with self.__lock:
+            if key not in self.__entries:
+                return default
+            value, size = self.__entries.pop(key)
+            self.__entries[key] = (value, size)
+            return value
+
+    def put(self, key, value, size=1):
+        """ Store a value, evicting the least recently used ones. """
+        with self.__lock:
+            if key in self.__entries:
+                self.__size -= self.__entries.pop(key)[1]
+            if size > self.__max_size:
+                return
+            self.__entries[key] = (value, size)
+            self.__size += size
+            while self.__size > self.__max_size:
+                self.__size -= self.__entries.popitem(last=False)[1][1]
+
+    def pop(self, key, default=None):
+        """ Remove a value. """
+        with self.__lock:
+            if key not in self.__entries:
+                return default
+            value, size = self.__entries.pop(key)
+            self.__size -= size
+            return value
+
+    def keys(self):
+        """ The cached keys, least recently used first. """
+        with self.__lock:
+            return list(self.__entries.keys())
+
+    def clear(self):
+        """ Drop every value. """
+        with self.__lock:
+            self.__entries.clear()
+            self.__size = 0
+
+
+class CacheEntry(object):
+
+    """ A cached response."""
+
+    def __init__(self, data, ttl, etag=None, last_modified=None):
+        """ Init. """
+        self.data = data
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = time.time()
+
+    def fresh(self):
+        """ Test if the entry can be used without asking the server. """
+        return time.time() - self.stored < self.ttl
+
+    def touch(self):
+        """ The server confirmed the entry is still current. """
+        self.stored = time.time()
+
+    def conditional_headers(self):
+        """ Headers that let the server answer 304 Not Modified. """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+
+    """
+    Cache of GET responses.
+
+    Entries are keyed by (address, id, element, params), bounded by the size
+    of the response bodies in bytes and expire after the cache_ttl of their
+    resource.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """ Init. """
+        self.__entries = LRUCache(max_bytes)
+
+    @staticmethod
+    def key(address, resource_id=None, element=None, params=None):
+        """ Build the cache key of a request. """
+        if params:
+            params = json.dumps(params, sort_keys=True)
+        else:
+            params = None
+        if resource_id is not None:
+            resource_id = str(resource_id)
+        return (address, resource_id, element, params)
+
+    def get(self, key):
+        """ Get an entry, fresh or not. """
+        return self.__entries.get(key)
+
+    def put(self, key, resource, response, data):
+        """ Store the decoded data of a response. """
+        entry = CacheEntry(
+            data,
+            resource.get('cache_ttl', DEFAULT_TTL),
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified')
+        )
+        self.__entries.put(key, entry, len(response.content))
+        return entry
+
+    def invalidate(self, address):
+        """ Drop every entry of an address. """
+        for key in self.__entries.keys():
+            if key[0] == address:
+                self.__entries.pop(key)
+
+    def clear(self):
+        """ Drop every entry. """
+        self.__entries.clear()
+
+    def size(self):
+        """ Bytes held by the cache. """
+        return self.__entries.size()
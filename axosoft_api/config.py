@@ -8,116 +8,147 @@ RESOURCES = {
     "attachments": {
         "address": "attachments",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 300,
         "resources": ["data"]
     },
     "contacts": {
         "address": "contacts",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 300,
         "required": ["customer", "first_name", "last_name"]
     },
     "customers": {
         "address": "customers",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 300,
         "required": ["company_name"]
     },
     "defects": {
         "address": "defects",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 30,
+        "columns": ["id", "name", "item_type", "assigned_to",
+                    "last_updated_date_time"],
         "required": ["item"],
         "resources": ["attachments", "comments", "emails", "notifications"]
     },
     "features": {
         "address": "features",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 30,
+        "columns": ["id", "name", "item_type", "assigned_to",
+                    "last_updated_date_time"],
         "required": ["item"],
         "resources": ["attachments", "comments", "emails", "notifications"]
     },
     "filters": {
         "address": "filters",
         "verbs": ["GET"],
+        "cache_ttl": 600,
         "required": []
     },
     "tasks": {
         "address": "tasks",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 30,
+        "columns": ["id", "name", "item_type", "assigned_to",
+                    "last_updated_date_time"],
         "required": ["item"],
         "resources": ["attachments", "comments", "emails", "notifications"]
     },
     "incidents": {
         "address": "incidents",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 30,
+        "columns": ["id", "name", "item_type", "assigned_to",
+                    "last_updated_date_time"],
         "required": ["item"],
         "resources": ["attachments", "comments", "emails", "notifications"]
     },
     "emails": {
         "address": "emails",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 60,
         "required": ["subject", "body", "to", "from", "email_type", "item"],
         "resources": ["attachments"]
     },
     "fields": {
         "address": "fields",
         "verbs": ["GET"],
+        "cache_ttl": 3600,
         "required": []
     },
     "fields/custom": {
         "address": "fields/custom",
         "verbs": ["GET"],
+        "cache_ttl": 3600,
         "required": []
     },
     "item_relations": {
         "address": "item_relations",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 60,
         "required": ["relation_type", "parent_item", "child_item"]
     },
     "me": {
         "address": "me",
         "verbs": ["GET"],
+        "cache_ttl": 300,
         "required": []
     },
     "picklists": {
         "address": "picklists",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 3600,
         "required": []
     },
     "projects": {
         "address": "projects",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 600,
+        "columns": ["id", "name", "children"],
         "required": ["name"],
         "resources": ["attachments", "workflow"]
     },
     "releases": {
         "address": "releases",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 300,
         "required": ["name", "release_type"]
     },
     "security_roles": {
         "address": "security_roles",
-        "verbs": ["GET"]
+        "verbs": ["GET"],
+        "cache_ttl": 3600
     },
     "settings": {
         "address": "settings",
         "verbs": ["GET"],
+        "cache_ttl": 3600,
         "required": []
     },
     "users": {
         "address": "users",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 600,
         "required": ["first_name", "last_name", "security_roles"]
     },
     "work_logs": {
         "address": "work_logs",
         "verbs": ["GET", "POST", "DELETE"],
+        "cache_ttl": 30,
         "required": ["user", "work_done", "item", "date_time"]
     },
     "workflow_steps": {
         "address": "workflow_steps",
         "verbs": ["GET"],
+        "cache_ttl": 3600,
         "required": []
     },
     "workflows": {
         "address": "workflows",
         "verbs": ["GET"],
+        "cache_ttl": 3600,
         "required": []
     },
 }
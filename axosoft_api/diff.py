@@ -0,0 +1,19 @@
+"""
+Diff.
+
+Work out which fields of a resource were changed.
+"""
+
+
+def diff(old, new):
+    """
+    Return the fields of new that differ from old.
+
+    A changed field is sent whole, nested objects like assigned_to need all
+    of their keys to be understood by the API. Fields removed from new
+    can't be expressed in an update and are ignored.
+    """
+    return dict(
+        (key, value) for key, value in new.items()
+        if key not in old or old[key] != value
+    )
@@ -0,0 +1,137 @@
+"""
+Executor.
+
+Run work on a bounded pool of background threads.
+"""
+import threading
+import traceback
+# pylint: disable=F0401
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class Job(object):
+
+    """ A unit of work submitted to an Executor."""
+
+    def __init__(self, func, args, kwargs, on_done=None, on_error=None):
+        """ Init. """
+        self.__func = func
+        self.__args = args
+        self.__kwargs = kwargs
+        self.__on_done = on_done
+        self.__on_error = on_error
+        self.__cancelled = threading.Event()
+        self.__finished = threading.Event()
+        self.__result = None
+        self.__error = None
+
+    def cancel(self):
+        """
+        Cancel the job.
+
+        A job that has not started is skipped, a running job is left to
+        finish but its callbacks are not called.
+        """
+        self.__cancelled.set()
+
+    def cancelled(self):
+        """ Test if the job was cancelled. """
+        return self.__cancelled.is_set()
+
+    def done(self):
+        """ Test if the job has finished. """
+        return self.__finished.is_set()
+
+    def result(self, timeout=None):
+        """ Wait for the job and return its result or raise its error. """
+        if not self.__finished.wait(timeout):
+            raise RuntimeError('Job did not finish in time')
+        if self.__error is not None:
+            raise self.__error
+        return self.__result
+
+    def run(self):
+        """ Run the job on the calling thread. """
+        if self.cancelled():
+            self.__finished.set()
+            return
+
+        # pylint: disable=W0703
+        try:
+            self.__result = self.__func(*self.__args, **self.__kwargs)
+        except Exception as error:
+            self.__error = error
+        self.__finished.set()
+
+        if self.cancelled():
+            pass
+        elif self.__error is not None:
+            if self.__on_error is not None:
+                self.__on_error(self.__error)
+        elif self.__on_done is not None:
+            self.__on_done(self.__result)
+
+
+class Executor(object):
+
+    """ A bounded pool of daemon worker threads."""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        """ Init. """
+        self.__max_workers = max_workers
+        self.__jobs = queue.Queue()
+        self.__workers = []
+        self.__lock = threading.Lock()
+
+    def __work(self):
+        """ Worker loop. """
+        while True:
+            job = self.__jobs.get()
+            if job is None:
+                break
+            # pylint: disable=W0703
+            try:
+                job.run()
+            except Exception:
+                # A failing callback must not take the worker down with it.
+                traceback.print_exc()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue func to be called with args on a worker thread.
+
+        The keyword arguments on_done and on_error are callbacks that receive
+        the result or the raised error, they run on the worker thread.
+        """
+        on_done = kwargs.pop('on_done', None)
+        on_error = kwargs.pop('on_error', None)
+        job = Job(func, args, kwargs, on_done, on_error)
+
+        with self.__lock:
+            # Workers are started lazily and then live for the session.
+            if len(self.__workers) < self.__max_workers:
+                worker = threading.Thread(target=self.__work)
+                worker.daemon = True
+                self.__workers.append(worker)
+                worker.start()
+            self.__jobs.put(job)
+
+        return job
+
+    def is_worker(self):
+        """ Test if the calling thread is one of the workers. """
+        with self.__lock:
+            return threading.current_thread() in self.__workers
+
+    def shutdown(self):
+        """ Stop every worker once the queued jobs are done. """
+        with self.__lock:
+            workers = list(self.__workers)
+            self.__workers = []
+        for _ in workers:
+            self.__jobs.put(None)
@@ -0,0 +1,324 @@
+"""
+Journal.
+
+A durable queue of writes, sent to the API in the background.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+from .bulk import BulkResult, DEFAULT_CONCURRENCY, run_bulk
+from .retry import RetryPolicy
+from .transfer import replace_file
+from .validate import AuthenticationError, \
+    ServerError, \
+    validate_address, \
+    validate_required_params
+
+# Errors after which the same write may succeed later
+RETRY_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    ServerError,
+    AuthenticationError
+)
+# Fields of a payload that refer to another item by id
+REFERENCE_FIELDS = ('item', 'parent')
+MAX_BATCH = 20
+COMPACT_AFTER = 200
+FLUSH_BACKOFF = 2.0
+FLUSH_MAX_BACKOFF = 300.0
+
+
+def _references(payload):
+    """ Ids of the items a payload refers to. """
+    ids = set()
+    if not isinstance(payload, dict):
+        return ids
+    for field in REFERENCE_FIELDS:
+        value = payload.get(field)
+        if isinstance(value, dict):
+            if value.get('id') is not None:
+                ids.add(value['id'])
+            ids |= _references(value)
+    return ids
+
+
+class WriteQueue(object):
+
+    """
+    Creates, updates and deletes, acknowledged locally and sent later.
+
+    Every write is appended to a journal file and synced to disk before it
+    is acknowledged, so it survives a crash or restart. flush sends the
+    writes in the order they were queued. Consecutive writes to different
+    resources are sent concurrently as a batch, writes to the same
+    item never overlap, whether they change it or, like a work log, refer
+    to it. A write failing with a network or server error
+    stops the flush and is retried by the next one, a write the API
+    rejects is dropped and reported.
+
+    Each write has a key, sent as its Idempotency-Key header, so a write
+    replayed after a crash mid request can be recognised.
+
+    Writes are sent with whatever token the client holds, keep one journal
+    per user and only one queue per journal. Batches are sent on executor,
+    a flush running on one of its workers sends them one at a time.
+    """
+
+    def __init__(self, client, path, executor=None,
+                 concurrency=DEFAULT_CONCURRENCY, retry=None):
+        """ Init. """
+        self.__client = client
+        self.__path = path
+        self.__executor = executor
+        self.__concurrency = concurrency
+        self.__retry = retry if retry is not None else RetryPolicy(
+            backoff=FLUSH_BACKOFF,
+            max_backoff=FLUSH_MAX_BACKOFF
+        )
+        self.__lock = threading.Lock()
+        self.__flushing = threading.Lock()
+        self.__pending = []
+        self.__entries = 0
+        self.__failures = 0
+        self.__load()
+
+    def __len__(self):
+        """ Number of writes waiting to be sent. """
+        return len(self.__pending)
+
+    def __load(self):
+        """ Replay the journal left by an earlier session. """
+        try:
+            with open(self.__path) as journal:
+                lines = journal.readlines()
+        except (IOError, OSError):
+            return
+
+        pending = {}
+        order = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line of a journal cut short by a crash
+                continue
+            if entry.get('op') == 'add':
+                pending[entry['write']['key']] = entry['write']
+                order.append(entry['write']['key'])
+            else:
+                pending.pop(entry.get('key'), None)
+        self.__pending = [pending[x] for x in order if x in pending]
+        self.__entries = len(lines)
+
+    def __append(self, entries):
+        """ Append entries to the journal and sync it to disk. """
+        if not entries:
+            return
+        with open(self.__path, 'a') as journal:
+            for entry in entries:
+                journal.write(json.dumps(entry) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        self.__entries += len(entries)
+
+    def __compact(self):
+        """ Rewrite the journal once finished writes dominate it. """
+        if self.__entries < COMPACT_AFTER + 2 * len(self.__pending):
+            return
+        temp_path = '{0}.tmp'.format(self.__path)
+        with open(temp_path, 'w') as journal:
+            for write in self.__pending:
+                journal.write(json.dumps({'op': 'add', 'write': write}))
+                journal.write('\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        replace_file(temp_path, self.__path)
+        self.__entries = len(self.__pending)
+
+    def __add(self, verb, address, resource_id=None, payload=None):
+        """ Journal a write, returns its key. """
+        write = {
+            'key': uuid.uuid4().hex,
+            'verb': verb,
+            'address': address,
+            'resource_id': resource_id,
+            'payload': payload,
+            'queued': time.time()
+        }
+        with self.__lock:
+            self.__append([{'op': 'add', 'write': write}])
+            self.__pending.append(write)
+        return write['key']
+
+    def path(self):
+        """ The journal file. """
+        return self.__path
+
+    def set_client(self, client):
+        """ Send the following writes through another client. """
+        self.__client = client
+
+    def clear(self):
+        """ Drop every pending write and remove the journal. """
+        with self.__lock:
+            self.__pending = []
+            self.__entries = 0
+            if os.path.exists(self.__path):
+                os.remove(self.__path)
+
+    def pending(self):
+        """ The writes waiting to be sent, oldest first. """
+        with self.__lock:
+            return list(self.__pending)
+
+    def create(self, address, payload):
+        """ Queue the creation of a resource, returns the write's key. """
+        validate_required_params(validate_address(address, 'POST'), payload)
+        return self.__add('create', address, payload=payload)
+
+    def update(self, address, resource_id, payload):
+        """ Queue an update of a resource, returns the write's key. """
+        validate_address(address, 'POST')
+        return self.__add('update', address, resource_id, payload)
+
+    def delete(self, address, resource_id):
+        """ Queue the deletion of a resource, returns the write's key. """
+        validate_address(address, 'DELETE')
+        return self.__add('delete', address, resource_id)
+
+    def __send(self, write):
+        """ Send one write. """
+        if write['verb'] == 'create':
+            try:
+                return self.__client.create(
+                    write['address'],
+                    write['payload'],
+                    idempotency_key=write['key']
+                )
+            except AuthenticationError:
+                raise
+            except ValueError as error:
+                # Items are created with a 200 instead of a 201
+                if (isinstance(error.args[0], dict)
+                        and 'data' in error.args[0]):
+                    return error.args[0]
+                raise
+        elif write['verb'] == 'update':
+            return self.__client.update(
+                write['address'],
+                write['resource_id'],
+                write['payload'],
+                idempotency_key=write['key']
+            )
+        return self.__client.delete(
+            write['address'],
+            write['resource_id'],
+            idempotency_key=write['key']
+        )
+
+    def __batch(self):
+        """ The next writes that may be sent together. """
+        with self.__lock:
+            pending = list(self.__pending)
+        batch = []
+        touched = set()
+        for write in pending[:MAX_BATCH]:
+            # Compared by id alone, references don't name the item's address
+            ids = _references(write['payload'])
+            if write['resource_id'] is not None:
+                ids.add(write['resource_id'])
+            if ids & touched:
+                break
+            touched |= ids
+            batch.append(write)
+        return batch
+
+    def __run(self, batch):
+        """ Send a batch, returns a BulkResult per write. """
+        # On one of its workers, waiting for the batch could deadlock
+        if (self.__executor is None or len(batch) == 1
+                or self.__executor.is_worker()):
+            results = []
+            # pylint: disable=W0703
+            for write in batch:
+                try:
+                    data = self.__send(write)
+                    results.append(BulkResult(write['key'], data))
+                except Exception as error:
+                    results.append(BulkResult(write['key'], error=error))
+            return results
+        return run_bulk(
+            self.__executor,
+            self.__send,
+            [(write['key'], (write,)) for write in batch],
+            self.__concurrency
+        )
+
+    def flush(self, on_finished=None):
+        """
+        Send queued writes until none are left or one has to be retried.
+
+        Returns (write, BulkResult) pairs of the writes that were sent or
+        dropped. An AuthenticationError is raised once the writes before
+        it are accounted for, nothing is sent while another flush runs.
+        on_finished is called with the same pairs, also when an error is
+        raised, so writes that already left the journal are reported.
+        """
+        if not self.__flushing.acquire(False):
+            return []
+
+        finished = []
+        try:
+            while True:
+                batch = self.__batch()
+                if not batch:
+                    break
+
+                results = self.__run(batch)
+                done = []
+                retry = None
+                for write, result in zip(batch, results):
+                    if (result.success
+                            or not isinstance(result.error, RETRY_ERRORS)):
+                        done.append((write, result))
+                    elif retry is None:
+                        retry = result.error
+
+                with self.__lock:
+                    keys = set(write['key'] for write, _ in done)
+                    self.__append([
+                        {
+                            'op': 'done' if result.success else 'failed',
+                            'key': write['key']
+                        }
+                        for write, result in done
+                    ])
+                    self.__pending = [
+                        x for x in self.__pending if x['key'] not in keys
+                    ]
+                    self.__compact()
+                finished += done
+
+                if retry is not None:
+                    self.__failures += 1
+                    if isinstance(retry, AuthenticationError):
+                        raise retry
+                    break
+                self.__failures = 0
+        finally:
+            self.__flushing.release()
+            if on_finished is not None:
+                on_finished(finished)
+        return finished
+
+    def retry_delay(self):
+        """ Seconds to wait before the next flush, None if none is due. """
+        if not self.__pending:
+            return None
+        return self.__retry.delay(max(0, self.__failures - 1))
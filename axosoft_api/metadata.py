@@ -0,0 +1,199 @@
+"""
+Metadata.
+
+Reference data that rarely changes, persisted to disk between sessions.
+"""
+import json
+import os
+import threading
+import time
+from .transfer import replace_file
+from .validate import AuthenticationError
+
+METADATA_RESOURCES = [
+    'me',
+    'projects',
+    'picklists',
+    'fields',
+    'fields/custom',
+    'workflows',
+    'workflow_steps',
+    'security_roles'
+]
+FORMAT_VERSION = 1
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+
+def _flatten(items, children='children'):
+    """ Walk a tree of items, such as projects and their sub projects. """
+    for item in items or []:
+        yield item
+        for child in _flatten(item.get(children), children):
+            yield child
+
+
+class MetadataCache(object):
+
+    """
+    Projects, picklists, fields, workflows and the current user.
+
+    The data is kept in one JSON file per domain, tagged with the format
+    version and the id of the user it was fetched for. A file written for
+    another version or domain is ignored, and data of another user is
+    dropped once me has been refreshed.
+    """
+
+    def __init__(self, client, path, domain, max_age=DEFAULT_MAX_AGE):
+        """ Init. """
+        self.__client = client
+        self.__path = path
+        self.__domain = domain
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        # Held while the file is written, refreshes may run concurrently
+        self.__saving = threading.Lock()
+        self.__resources = {}
+        self.__load()
+
+    def __load(self):
+        """ Read the file written by an earlier session. """
+        try:
+            with open(self.__path) as cache_file:
+                saved = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return
+
+        if (saved.get('version') == FORMAT_VERSION
+                and saved.get('domain') == self.__domain):
+            self.__resources = saved.get('resources', {})
+
+    def __save(self):
+        """ Write the file, replacing the old one in a single step. """
+        with self.__saving:
+            # Taken inside the write lock, the last write has the latest
+            with self.__lock:
+                resources = dict(self.__resources)
+            me = resources.get('me', {}).get('data') or {}
+            saved = {
+                'version': FORMAT_VERSION,
+                'domain': self.__domain,
+                'user_id': me.get('id'),
+                'resources': resources
+            }
+            temp_path = '{0}.tmp'.format(self.__path)
+            with open(temp_path, 'w') as cache_file:
+                json.dump(saved, cache_file)
+            replace_file(temp_path, self.__path)
+
+    def clear(self):
+        """ Forget everything, for instance when logging out. """
+        with self.__saving:
+            with self.__lock:
+                self.__resources = {}
+            if os.path.exists(self.__path):
+                os.remove(self.__path)
+
+    def stale(self, address):
+        """ Test if a resource is missing or older than max_age. """
+        with self.__lock:
+            resource = self.__resources.get(address)
+        return (resource is None
+                or time.time() - resource['fetched'] > self.__max_age)
+
+    def get(self, address):
+        """ The cached data of a resource, None if it was never fetched. """
+        with self.__lock:
+            resource = self.__resources.get(address)
+        return resource['data'] if resource is not None else None
+
+    def fetch(self, address):
+        """
+        The data of a resource, fetched now if it isn't cached.
+
+        Raises the error of a failed fetch, or AuthenticationError when
+        nothing could be fetched without a token.
+        """
+        data = self.get(address)
+        if data is None:
+            self.refresh([address], force=True)
+            data = self.get(address)
+        if data is None:
+            raise AuthenticationError(
+                'Log in to Axosoft to load {0}'.format(address)
+            )
+        return data
+
+    def refresh(self, addresses=None, force=False):
+        """
+        Fetch stale resources in parallel and save them.
+
+        Returns the addresses that were refreshed.
+        """
+        addresses = [
+            address for address in addresses or METADATA_RESOURCES
+            if force or self.stale(address)
+        ]
+        if not addresses:
+            return []
+
+        results = self.__client.warm_up(addresses)
+        # Look at me first, a new user invalidates everything else
+        results.sort(key=lambda x: x.resource_id != 'me')
+        fetched = time.time()
+        refreshed = []
+        with self.__lock:
+            for result in results:
+                if not result.success:
+                    continue
+                if result.resource_id == 'me':
+                    old = (self.__resources.get('me') or {}).get('data') or {}
+                    if old.get('id') != result.data['data'].get('id'):
+                        self.__resources = {}
+                self.__resources[result.resource_id] = {
+                    'fetched': fetched,
+                    'data': result.data['data']
+                }
+                refreshed.append(result.resource_id)
+
+        if refreshed:
+            self.__save()
+        elif results:
+            raise results[0].error
+        return refreshed
+
+    def me(self):
+        """ The current user. """
+        return self.get('me')
+
+    def projects(self):
+        """ Every project, sub projects included. """
+        return list(_flatten(self.get('projects')))
+
+    def project(self, project_id):
+        """ A project by id. """
+        for project in self.projects():
+            if project['id'] == project_id:
+                return project
+        return None
+
+    def project_by_name(self, name):
+        """ A project by name. """
+        for project in self.projects():
+            if project['name'] == name:
+                return project
+        return None
+
+    def picklist_value(self, picklist_type, name):
+        """ A picklist value, such as a priority, by name. """
+        picklists = self.get('picklists') or {}
+        for value in picklists.get(picklist_type, []):
+            if value.get('name') == name:
+                return value
+        return None
+
+    def workflow_step(self, step_id):
+        """ A workflow step by id. """
+        for step in self.get('workflow_steps') or []:
+            if step.get('id') == step_id:
+                return step
+        return None
@@ -0,0 +1,115 @@
+"""
+Retry.
+
+Retry transient failures and throttle requests on the client side.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_VERBS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+# The server turned these away without processing them, any verb may retry
+UNPROCESSED_STATUSES = frozenset([429])
+
+
+class RetryPolicy(object):
+
+    """
+    When and how long to wait before sending a request again.
+
+    Only idempotent verbs are retried, unless the response says the request
+    was not processed at all. Waits grow exponentially with full
+    jitter unless the server sent a Retry-After header.
+    """
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30.0,
+                 max_retry_after=120.0, statuses=RETRY_STATUSES,
+                 verbs=IDEMPOTENT_VERBS, unprocessed=UNPROCESSED_STATUSES):
+        """ Init. """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.statuses = statuses
+        self.verbs = verbs
+        self.unprocessed = unprocessed
+
+    def should_retry(self, verb, attempt, response=None):
+        """
+        Test if a failed attempt should be retried.
+
+        response is None when the request failed to get a response at all.
+        """
+        if attempt >= self.max_retries:
+            return False
+        if response is not None and response.status_code in self.unprocessed:
+            return True
+        if verb not in self.verbs:
+            return False
+        return response is None or response.status_code in self.statuses
+
+    @staticmethod
+    def retry_after(response):
+        """ Seconds asked for by a Retry-After header, None if absent. """
+        if response is None:
+            return None
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            date = parsedate_tz(value)
+            if date is None:
+                return None
+            return max(0.0, mktime_tz(date) - time.time())
+
+    def delay(self, attempt, response=None):
+        """ Seconds to wait before the next attempt. """
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        cap = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(0, cap)
+
+
+class TokenBucket(object):
+
+    """
+    A thread safe token bucket.
+
+    Tokens refill at rate per second up to capacity, acquire blocks until
+    one is available. Share one bucket between every thread using a client.
+    Capacity defaults to rate, but at least one token, so rates below one
+    per second work.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """ Init. """
+        if capacity is None:
+            capacity = max(1.0, rate)
+        if capacity < 1:
+            raise ValueError('A token bucket must hold at least one token')
+        self.__rate = float(rate)
+        self.__capacity = float(capacity)
+        self.__tokens = self.__capacity
+        self.__updated = time.time()
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """ Take tokens, waiting for them if necessary. """
+        while True:
+            with self.__lock:
+                now = time.time()
+                self.__tokens = min(
+                    self.__capacity,
+                    self.__tokens + (now - self.__updated) * self.__rate
+                )
+                self.__updated = now
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return
+                wait = (tokens - self.__tokens) / self.__rate
+            time.sleep(wait)
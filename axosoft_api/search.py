@@ -0,0 +1,313 @@
+"""
+Search.
+
+A local inverted index over items for instant ranked search.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+
+from . import summary
+
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'description': 1.0,
+    'custom_fields': 1.0
+}
+MAX_PREFIX_EXPANSION = 50
+# A rarest word matching no more items than this has them all scored
+MAX_CANDIDATES = 1000
+TOKEN = re.compile(r'\w+', re.UNICODE)
+TAG = re.compile(r'<[^>]+>')
+
+
+def tokenize(text):
+    """ Split text into lower case words, dropping any HTML tags. """
+    return TOKEN.findall(TAG.sub(' ', text).lower())
+
+
+def _field_text(value):
+    """ Flatten a field value into searchable text. """
+    if value is None:
+        return ''
+    elif isinstance(value, dict):
+        return ' '.join(_field_text(x) for x in value.values())
+    elif isinstance(value, (list, tuple)):
+        return ' '.join(_field_text(x) for x in value)
+    else:
+        return '{0}'.format(value)
+
+
+class SearchIndex(object):
+
+    """
+    Inverted index over the id, name, description and custom fields of items.
+
+    Every word of a query must match, the last one may match as a prefix so
+    partly typed queries find results. Hits are ranked by the field weight
+    of each matched word times its inverse document frequency.
+
+    Searches with a limit look at the items of each word by weight, best
+    first, and stop once no item further down can make the top, so common
+    words that match most items don't cost a score per item.
+
+    Only the summary of each item is kept and returned, its description and
+    custom fields are indexed but not held on to.
+    """
+
+    def __init__(self, item_type=None):
+        """ Init. """
+        self.__item_type = item_type
+        self.__lock = threading.Lock()
+        self.__postings = {}
+        self.__ranked = {}
+        self.__documents = {}
+        self.__items = {}
+        self.__tokens = []
+        self.__tokens_dirty = False
+        self.__updated = None
+
+    def __len__(self):
+        """ Number of indexed items. """
+        with self.__lock:
+            return len(self.__items)
+
+    def stale(self, max_age):
+        """
+        Test if the index is empty or was not updated for max_age.
+
+        Doesn't wait for the lock, an index still being built is stale.
+        """
+        updated = self.__updated
+        return (updated is None or not self.__items
+                or time.time() - updated > max_age)
+
+    def __unindex(self, item_id):
+        """ Remove one item, the lock must be held. """
+        for token in self.__documents.pop(item_id, {}):
+            posting = self.__postings[token]
+            del posting[item_id]
+            self.__ranked.pop(token, None)
+            if not posting:
+                del self.__postings[token]
+                self.__tokens_dirty = True
+        self.__items.pop(item_id, None)
+
+    def add(self, items):
+        """ Index items, replacing older versions of the same items. """
+        with self.__lock:
+            for item in items:
+                weights = {}
+                weights[str(item['id'])] = FIELD_WEIGHTS['name']
+                for field, weight in FIELD_WEIGHTS.items():
+                    for token in tokenize(_field_text(item.get(field))):
+                        weights[token] = weights.get(token, 0) + weight
+
+                self.__unindex(item['id'])
+                for token, weight in weights.items():
+                    if token not in self.__postings:
+                        self.__postings[token] = {}
+                        self.__tokens_dirty = True
+                    self.__postings[token][item['id']] = weight
+                    self.__ranked.pop(token, None)
+                self.__documents[item['id']] = weights
+                self.__items[item['id']] = summary(self.__item_type, item)
+            self.__sort_tokens()
+            self.__updated = time.time()
+
+    def remove(self, item_ids):
+        """ Remove items from the index. """
+        with self.__lock:
+            for item_id in item_ids:
+                self.__unindex(item_id)
+            self.__sort_tokens()
+            self.__updated = time.time()
+
+    def __sort_tokens(self):
+        """ Keep the token list used for prefix matches sorted. """
+        if self.__tokens_dirty:
+            self.__tokens = sorted(self.__postings)
+            self.__tokens_dirty = False
+
+    def __expand(self, prefix):
+        """ Indexed tokens starting with prefix, the lock must be held. """
+        start = bisect.bisect_left(self.__tokens, prefix)
+        tokens = []
+        for token in self.__tokens[start:start + MAX_PREFIX_EXPANSION]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def __tiers(self, token):
+        """
+        The items of a token grouped by weight, best first.
+
+        Each tier is its weight and its sorted item ids, built when first
+        needed and dropped when the token changes. The lock must be held.
+        """
+        tiers = self.__ranked.get(token)
+        if tiers is None:
+            groups = {}
+            for item_id, weight in self.__postings[token].items():
+                groups.setdefault(weight, []).append(item_id)
+            tiers = self.__ranked[token] = [
+                (weight, sorted(groups[weight]))
+                for weight in sorted(groups, reverse=True)
+            ]
+        return tiers
+
+    def __intersect(self, entries, limit, seen):
+        """ The lowest ids, up to limit, in every tier of entries. """
+        entries = sorted(entries, key=lambda x: len(x[3]))
+        others = [(self.__postings[x[1]], x[2]) for x in entries[1:]]
+        found = []
+        for item_id in entries[0][3]:
+            if item_id in seen:
+                continue
+            for posting, weight in others:
+                if posting.get(item_id) != weight:
+                    break
+            else:
+                found.append(item_id)
+                if len(found) == limit:
+                    break
+        return found
+
+    def __score(self, item_id, matches):
+        """ Score of an item, None unless it matches every word. """
+        document = self.__documents[item_id]
+        score = 0
+        for word_matches in matches:
+            best = 0
+            for token, idf in word_matches:
+                weight = document.get(token)
+                if weight is not None and weight * idf > best:
+                    best = weight * idf
+            if not best:
+                return None
+            score += best
+        return score
+
+    def __top(self, matches, limit):
+        """
+        Ids of the limit best items, the lock must be held.
+
+        When a word is rare its items are scored one by one. Otherwise,
+        an item's score is the sum of one tier per word, so combinations
+        of tiers are visited best first and only their items are looked
+        at, until the next combination can't beat the last of the top.
+        An item is found first at its best combination, ties go to the
+        lower id like in a full ranking.
+        """
+        if limit < 1:
+            return []
+        rarest = min(
+            matches,
+            key=lambda x: sum(len(self.__postings[y]) for y, _ in x)
+        )
+        if sum(len(self.__postings[x]) for x, _ in rarest) <= MAX_CANDIDATES:
+            scores = {}
+            for token, _ in rarest:
+                for item_id in self.__postings[token]:
+                    if item_id not in scores:
+                        scores[item_id] = self.__score(item_id, matches)
+            return heapq.nsmallest(
+                limit,
+                [x for x in scores if scores[x] is not None],
+                key=lambda x: (-scores[x], x)
+            )
+
+        words = []
+        for word_matches in matches:
+            entries = [
+                (weight * idf, token, weight, ids)
+                for token, idf in word_matches
+                for weight, ids in self.__tiers(token)
+            ]
+            entries.sort(key=lambda x: -x[0])
+            words.append(entries)
+
+        def score(combination):
+            """ Summed in word order, like a full ranking. """
+            return sum(words[x][y][0] for x, y in enumerate(combination))
+
+        start = (0,) * len(words)
+        queue = [(-score(start), start)]
+        queued = set([start])
+        seen = set()
+        top = []
+        while queue:
+            rank, combination = heapq.heappop(queue)
+            if len(top) == limit and rank > top[-1][0]:
+                break
+            for item_id in self.__intersect(
+                    [words[x][y] for x, y in enumerate(combination)],
+                    limit,
+                    seen):
+                seen.add(item_id)
+                top.append((rank, item_id))
+            top.sort()
+            del top[limit:]
+
+            for position, tier in enumerate(combination):
+                if tier + 1 < len(words[position]):
+                    following = combination[:position] + (tier + 1,) \
+                        + combination[position + 1:]
+                    if following not in queued:
+                        queued.add(following)
+                        heapq.heappush(queue, (-score(following), following))
+        return [item_id for _, item_id in top]
+
+    def __rank_all(self, matches):
+        """ Ids of every matching item, best first. """
+        scores = None
+        for word_matches in matches:
+            word_scores = {}
+            for token, idf in word_matches:
+                for item_id, weight in self.__postings[token].items():
+                    score = weight * idf
+                    if score > word_scores.get(item_id, 0):
+                        word_scores[item_id] = score
+
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = dict(
+                    (item_id, score + word_scores[item_id])
+                    for item_id, score in scores.items()
+                    if item_id in word_scores
+                )
+            if not scores:
+                return []
+        return sorted(scores, key=lambda x: (-scores[x], x))
+
+    def search(self, query, limit=None):
+        """ Ranked items matching every word of query. """
+        words = tokenize('{0}'.format(query))
+        if not words:
+            return []
+
+        with self.__lock:
+            total = float(len(self.__items))
+            matches = []
+            for position, word in enumerate(words):
+                if position == len(words) - 1:
+                    tokens = self.__expand(word)
+                else:
+                    tokens = [word] if word in self.__postings else []
+                if not tokens:
+                    return []
+                matches.append([
+                    (token, math.log(1 + total / len(self.__postings[token])))
+                    for token in tokens
+                ])
+
+            if limit is None:
+                ranked = self.__rank_all(matches)
+            else:
+                ranked = self.__top(matches, limit)
+            return [self.__items[item_id] for item_id in ranked]
@@ -0,0 +1,68 @@
+"""
+Single flight.
+
+Share one in-flight call between every caller asking for the same thing.
+"""
+import threading
+
+
+class _Call(object):
+
+    """ A call in flight."""
+
+    def __init__(self):
+        """ Init. """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+
+    """
+    Coalesce concurrent calls with the same key.
+
+    The first caller runs the call, callers arriving while it is in flight
+    wait for it and get the same result or error. Counts of calls and of
+    deduplicated calls are kept for stats.
+    """
+
+    def __init__(self):
+        """ Init. """
+        self.__lock = threading.Lock()
+        self.__calls = {}
+        self.__stats = {'calls': 0, 'deduplicated': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """ Call func, or wait for the identical call already running. """
+        with self.__lock:
+            self.__stats['calls'] += 1
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+            else:
+                self.__stats['deduplicated'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        # pylint: disable=W0703
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """ Counts of calls and of calls that shared another's result. """
+        with self.__lock:
+            return dict(self.__stats)
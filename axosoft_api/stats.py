@@ -0,0 +1,239 @@
+"""
+Stats.
+
+Record every request made by a client and aggregate them per resource.
+"""
+import json
+import threading
+import time
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class RequestRecord(object):
+
+    """
+    One request, or one GET answered from the cache.
+
+    Times are in seconds. ttfb is the time until the response headers of
+    the last attempt were read, dns and connect are None when the HTTP
+    library does not report them. cache is None without a response cache,
+    otherwise 'hit', 'revalidated' or 'miss'.
+    """
+
+    def __init__(self, verb, resource, status=None, started=None,
+                 ttfb=None, total=None, bytes_in=0, bytes_out=0, retries=0,
+                 cache=None, error=None):
+        """ Init. """
+        self.verb = verb
+        self.resource = resource
+        self.status = status
+        self.started = started if started is not None else time.time()
+        self.dns = None
+        self.connect = None
+        self.ttfb = ttfb
+        self.total = total
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.retries = retries
+        self.cache = cache
+        self.error = error
+
+    def as_dict(self):
+        """ The record as a JSON serializable dict. """
+        return {
+            'verb': self.verb,
+            'resource': self.resource,
+            'status': self.status,
+            'started': self.started,
+            'dns': self.dns,
+            'connect': self.connect,
+            'ttfb': self.ttfb,
+            'total': self.total,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'retries': self.retries,
+            'cache': self.cache,
+            'error': self.error
+        }
+
+
+class Histogram(object):
+
+    """ Counts of latencies in fixed buckets, with the exact sum and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """ Init. """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, milliseconds):
+        """ Count one latency. """
+        index = 0
+        while (index < len(self.buckets)
+               and milliseconds > self.buckets[index]):
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def mean(self):
+        """ Mean latency, None when empty. """
+        return self.total / self.count if self.count else None
+
+    def percentile(self, fraction):
+        """
+        Estimate a percentile as the upper bound of its bucket.
+
+        Latencies over the last bucket are reported as the max.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                break
+        return self.max
+
+
+class RequestStats(object):
+
+    """
+    A client hook aggregating requests per resource.
+
+    Pass it in the hooks of an Axosoft client. With export_path every
+    record is also appended to that file as a line of JSON.
+    """
+
+    def __init__(self, export_path=None):
+        """ Init. """
+        self.__export_path = export_path
+        self.__lock = threading.Lock()
+        self.__resources = {}
+        self.__since = time.time()
+
+    def __call__(self, record):
+        """ Aggregate one record. """
+        with self.__lock:
+            resource = self.__resources.get(record.resource)
+            if resource is None:
+                resource = self.__resources[record.resource] = {
+                    'requests': 0,
+                    'errors': 0,
+                    'retries': 0,
+                    'cache_hits': 0,
+                    'bytes_in': 0,
+                    'bytes_out': 0,
+                    'latency': Histogram()
+                }
+            resource['requests'] += 1
+            resource['retries'] += record.retries
+            resource['bytes_in'] += record.bytes_in
+            resource['bytes_out'] += record.bytes_out
+            if record.error is not None:
+                resource['errors'] += 1
+            if record.cache == 'hit':
+                resource['cache_hits'] += 1
+            elif record.total is not None:
+                # Only requests that went to the server
+                resource['latency'].add(1000 * record.total)
+
+            if self.__export_path:
+                with open(self.__export_path, 'a') as export_file:
+                    export_file.write(json.dumps(record.as_dict()) + '\n')
+
+    def reset(self):
+        """ Forget everything recorded so far. """
+        with self.__lock:
+            self.__resources = {}
+            self.__since = time.time()
+
+    def summary(self):
+        """ The aggregates of every resource, keyed by resource. """
+        with self.__lock:
+            summary = {}
+            for name, resource in self.__resources.items():
+                latency = resource['latency']
+                summary[name] = dict(
+                    (key, value) for key, value in resource.items()
+                    if key != 'latency'
+                )
+                summary[name].update({
+                    'mean_ms': latency.mean(),
+                    'p50_ms': latency.percentile(0.50),
+                    'p90_ms': latency.percentile(0.90),
+                    'p99_ms': latency.percentile(0.99),
+                    'max_ms': latency.max if latency.count else None,
+                    'histogram': list(zip(
+                        latency.buckets + [None],
+                        latency.counts
+                    ))
+                })
+            return summary
+
+    def render(self):
+        """ The aggregates as a plain text report. """
+        summary = self.summary()
+        lines = [
+            'Axosoft requests since {0}'.format(
+                time.strftime('%Y-%m-%d %H:%M:%S',
+                              time.localtime(self.__since))
+            ),
+            ''
+        ]
+        if not summary:
+            lines.append('No requests yet.')
+            return '\n'.join(lines) + '\n'
+
+        columns = '{0:<24}{1:>9}{2:>8}{3:>9}{4:>8}{5:>11}{6:>11}' \
+            '{7:>9}{8:>9}{9:>9}{10:>9}'
+        lines.append(columns.format(
+            'resource', 'requests', 'errors', 'retries', 'cached',
+            'bytes in', 'bytes out', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'
+        ))
+
+        def number(value):
+            """ A latency, or - if there is none. """
+            return '-' if value is None else '{0:.0f}'.format(value)
+
+        for name in sorted(summary):
+            resource = summary[name]
+            lines.append(columns.format(
+                name,
+                resource['requests'],
+                resource['errors'],
+                resource['retries'],
+                resource['cache_hits'],
+                resource['bytes_in'],
+                resource['bytes_out'],
+                number(resource['p50_ms']),
+                number(resource['p90_ms']),
+                number(resource['p99_ms']),
+                number(resource['max_ms'])
+            ))
+
+        for name in sorted(summary):
+            histogram = summary[name]['histogram']
+            most = max(count for _, count in histogram)
+            if not most:
+                continue
+            lines += ['', '{0} latency'.format(name)]
+            for bound, count in histogram:
+                label = '> {0}'.format(LATENCY_BUCKETS[-1]) \
+                    if bound is None else '<= {0}'.format(bound)
+                lines.append('{0:>10} ms {1:<40} {2}'.format(
+                    label,
+                    '#' * int(round(40.0 * count / most)),
+                    count
+                ))
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,186 @@
+"""
+Store.
+
+A local SQLite mirror of items, kept up to date incrementally.
+"""
+import json
+import threading
+from . import summary
+# pylint: disable=F0401
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+ITEM_TYPES = ['defects', 'features', 'tasks', 'incidents']
+WATERMARK_FIELD = 'last_updated_date_time'
+DELTA_FILTER = '{0}=ge"{1}"'
+SYNC_PAGE_SIZE = 500
+
+
+class ItemStore(object):
+
+    """
+    Items of every type, stored in one SQLite file per domain.
+
+    The first sync of an item type downloads every item, later syncs only
+    ask for items updated since the newest one already stored. Items
+    updated in the same instant as that one are not missed, the newest
+    stored items come back each time and are replaced. Items
+    deleted on the server are not noticed by a sync, deletes made through
+    this client should be passed to remove.
+
+    Next to each item its summary is stored, what lists show, so lists
+    don't decode whole items.
+    """
+
+    def __init__(self, path):
+        """ Init. """
+        if sqlite3 is None:
+            raise ImportError('sqlite3 is not available')
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS items ('
+                'item_type TEXT, id INTEGER, name TEXT, '
+                'assigned_to_id INTEGER, updated TEXT, data TEXT, '
+                'PRIMARY KEY (item_type, id))'
+            )
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                'item_type TEXT PRIMARY KEY, watermark TEXT)'
+            )
+            columns = [
+                row[1] for row in
+                self.__connection.execute('PRAGMA table_info(items)')
+            ]
+            if 'summary' not in columns:
+                # Stores made before summaries were kept
+                self.__connection.execute(
+                    'ALTER TABLE items ADD COLUMN summary TEXT'
+                )
+
+    def close(self):
+        """ Close the database. """
+        with self.__lock:
+            self.__connection.close()
+
+    def watermark(self, item_type):
+        """ Last updated time of the newest stored item, None if unsynced. """
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT watermark FROM sync_state WHERE item_type = ?',
+                (item_type,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def synced(self, item_type):
+        """ Test if the item type has been downloaded at least once. """
+        return self.watermark(item_type) is not None
+
+    def items(self, item_type, assigned_to_id=None, search=None, limit=None,
+              summaries=False):
+        """
+        Stored items, optionally filtered like the list endpoints.
+
+        limit caps the number of items, summaries returns their summaries
+        in place of the whole items.
+        """
+        if summaries:
+            # Rows stored before summaries were kept only have the item
+            query = 'SELECT COALESCE(summary, data) FROM items'
+        else:
+            query = 'SELECT data FROM items'
+        query += ' WHERE item_type = ?'
+        params = [item_type]
+
+        if assigned_to_id is not None:
+            query += ' AND assigned_to_id = ?'
+            params.append(assigned_to_id)
+
+        if search is not None:
+            search = str(search)
+            query += ' AND (CAST(id AS TEXT) = ? OR name LIKE ?)'
+            params.extend([search, '%{0}%'.format(search)])
+
+        query += ' ORDER BY id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self.__lock:
+            rows = self.__connection.execute(query, params).fetchall()
+        if summaries:
+            return [summary(item_type, json.loads(row[0])) for row in rows]
+        return [json.loads(row[0]) for row in rows]
+
+    def put(self, item_type, items):
+        """ Insert or replace items. """
+        rows = []
+        for item in items:
+            assigned_to = item.get('assigned_to') or {}
+            rows.append((
+                item_type,
+                item['id'],
+                item.get('name'),
+                assigned_to.get('id'),
+                item.get(WATERMARK_FIELD),
+                json.dumps(item),
+                json.dumps(summary(item_type, item))
+            ))
+        with self.__lock:
+            with self.__connection:
+                self.__connection.executemany(
+                    'INSERT OR REPLACE INTO items '
+                    '(item_type, id, name, assigned_to_id, updated, data, '
+                    'summary) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+
+    def remove(self, item_type, item_ids):
+        """ Remove items. """
+        with self.__lock:
+            with self.__connection:
+                self.__connection.executemany(
+                    'DELETE FROM items WHERE item_type = ? AND id = ?',
+                    [(item_type, item_id) for item_id in item_ids]
+                )
+
+    def __set_watermark(self, item_type, watermark):
+        """ Record how far the item type has been synced. """
+        with self.__lock:
+            with self.__connection:
+                self.__connection.execute(
+                    'INSERT OR REPLACE INTO sync_state VALUES (?, ?)',
+                    (item_type, watermark)
+                )
+
+    def sync(self, client, item_type, page_size=SYNC_PAGE_SIZE,
+             on_items=None):
+        """
+        Bring an item type up to date.
+
+        on_items is called with every page of added or changed items.
+        Returns the number of items received, that includes the newest
+        items stored by the last sync.
+        """
+        watermark = self.watermark(item_type)
+        payload = {}
+        if watermark:
+            payload['filters'] = DELTA_FILTER.format(
+                WATERMARK_FIELD,
+                watermark
+            )
+
+        newest = watermark or ''
+        changed = 0
+        for data in client.iter_pages(item_type, payload, page_size):
+            self.put(item_type, data)
+            if on_items is not None:
+                on_items(data)
+            changed += len(data)
+            for item in data:
+                newest = max(newest, item.get(WATERMARK_FIELD) or '')
+
+        self.__set_watermark(item_type, newest)
+        return changed
@@ -0,0 +1,122 @@
+"""
+Stream.
+
+Decode the elements of a JSON list response as its body arrives.
+"""
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+class _Reader(object):
+
+    """ A text buffer over an iterator of byte chunks."""
+
+    def __init__(self, chunks, decoder):
+        """ Init. """
+        self.__chunks = iter(chunks)
+        self.__unicode = codecs.getincrementaldecoder('utf-8')()
+        self.__decoder = decoder
+        self.__text = ''
+        self.__pos = 0
+        self.__eof = False
+
+    def __more(self):
+        """ Read the next chunk, returns False at the end of the body. """
+        if self.__eof:
+            return False
+        # Drop what was already consumed so memory stays bounded
+        self.__text = self.__text[self.__pos:]
+        self.__pos = 0
+        for chunk in self.__chunks:
+            text = self.__unicode.decode(chunk)
+            if text:
+                self.__text += text
+                return True
+        self.__text += self.__unicode.decode(b'', True)
+        self.__eof = True
+        return False
+
+    def char(self):
+        """ Consume and return the next non whitespace character. """
+        while True:
+            while (self.__pos < len(self.__text)
+                   and self.__text[self.__pos] in WHITESPACE):
+                self.__pos += 1
+            if self.__pos < len(self.__text):
+                self.__pos += 1
+                return self.__text[self.__pos - 1]
+            if not self.__more():
+                raise ValueError('Unexpected end of JSON body')
+
+    def peek(self):
+        """ Return the next non whitespace character without consuming. """
+        char = self.char()
+        self.__pos -= 1
+        return char
+
+    def expect(self, expected):
+        """ Consume the next character, which must be expected. """
+        char = self.char()
+        if char != expected:
+            raise ValueError(
+                'Expected {0!r} in JSON body, got {1!r}'.format(expected, char)
+            )
+
+    def value(self):
+        """ Consume and decode the next complete JSON value. """
+        self.peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(
+                    self.__text,
+                    self.__pos
+                )
+            except ValueError:
+                if not self.__more():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue
+            if end == len(self.__text) and self.__more():
+                continue
+            self.__pos = end
+            return value
+
+
+def iter_array(chunks, key='data', decoder=None):
+    """
+    Yield the elements of the list stored under key in a JSON object.
+
+    chunks is an iterator of bytes, such as response.iter_content(), only
+    the element being decoded and the unread part of the current chunk are
+    held in memory.
+    """
+    reader = _Reader(chunks, decoder or json.JSONDecoder())
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.char()
+            else:
+                while True:
+                    yield reader.value()
+                    char = reader.char()
+                    if char == ']':
+                        break
+                    elif char != ',':
+                        raise ValueError('Malformed list in JSON body')
+        else:
+            reader.value()
+
+        char = reader.char()
+        if char == '}':
+            return
+        elif char != ',':
+            raise ValueError('Malformed object in JSON body')
@@ -0,0 +1,56 @@
+"""
+Transfer.
+
+Helpers for moving files to and from the API without holding them in memory.
+"""
+import os
+
+
+class ProgressReader(object):
+
+    """
+    A file opened for reading, sent as a request body chunk by chunk.
+
+    requests streams any iterable body with a length, reading it in blocks
+    as the connection takes them. on_progress is called with the bytes read
+    so far and the size after every block.
+    """
+
+    def __init__(self, file_object, size, on_progress=None,
+                 chunk_size=64 * 1024):
+        """ Init. """
+        self.__file = file_object
+        self.__size = size
+        self.__read = 0
+        self.__on_progress = on_progress
+        self.__chunk_size = chunk_size
+
+    def __len__(self):
+        """ Bytes left to read. """
+        return self.__size - self.__read
+
+    def read(self, size=-1):
+        """ Read the next block. """
+        chunk = self.__file.read(size)
+        self.__read += len(chunk)
+        if chunk and self.__on_progress is not None:
+            self.__on_progress(self.__read, self.__size)
+        return chunk
+
+    def __iter__(self):
+        """ Yield the file in chunks. """
+        while True:
+            chunk = self.read(self.__chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def replace_file(source, destination):
+    """ Move source over destination, in a single step where possible. """
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+    else:
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
@@ -5,6 +5,20 @@ Some functions to validate methods.
 """
 from .config import RESOURCES
 
+# OAuth errors meaning the token, code or refresh token is no good
+OAUTH_REJECTIONS = ['invalid_token', 'invalid_grant', 'invalid_client',
+                    'unauthorized_client']
+
+
+class AuthenticationError(ValueError):
+
+    """ The API rejected the access token or the credentials. """
+
+
+class ServerError(ValueError):
+
+    """ The API failed or was busy, the request may succeed later. """
+
 
 def validate_address(address, verb, sub_resource=None):
     """ Test if address is valid. """
@@ -50,16 +64,48 @@ def validate_required_params(resource, payload):
         )
 
 
-def validate_response(response, expected_code):
-    """ Validate response. """
+def validate_status(response):
+    """
+    Raise ServerError for a 429 or 5xx response, before decoding it.
+
+    Proxies and gateways answer those with HTML, the body is only used for
+    the message when it is JSON.
+    """
+    if response.status_code != 429 and response.status_code < 500:
+        return
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and 'error_description' in data:
+        raise ServerError(data['error_description'])
+    raise ServerError(data or 'HTTP {0}'.format(response.status_code))
+
+
+def validate_response(response, expected_code, data=None):
+    """
+    Validate response.
+
+    data is the already decoded body, it is decoded here when not given.
+    """
     success = (response.status_code == expected_code)
     valid_response = (
         response.headers['content-type'] == 'application/json; charset=utf-8'
     )
-    data = response.json()
+    if data is None:
+        data = response.json()
 
     if success & valid_response:
         return True
+    elif (response.status_code == 401
+            or (isinstance(data, dict)
+                and data.get('error') in OAUTH_REJECTIONS)):
+        raise AuthenticationError(data.get('error_description', data))
+    elif response.status_code == 429 or response.status_code >= 500:
+        raise ServerError(
+            data.get('error_description', data)
+            if isinstance(data, dict) else data
+        )
     elif 'error_description' in data:
         raise ValueError(data['error_description'])
     else:
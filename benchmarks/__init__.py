@@ -0,0 +1,5 @@
+"""
+Benchmarks.
+
+Offline benchmarks of axosoft_api against a local stand-in server.
+"""
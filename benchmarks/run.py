@@ -0,0 +1,464 @@
+"""
+Run.
+
+Benchmark axosoft_api against the local stand-in server and report latency
+percentiles and throughput as JSON.
+
+    python -m benchmarks.run --items 2000 --latency 0.005 --output out.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from axosoft_api import Axosoft, summary
+from axosoft_api.search import SearchIndex
+# pylint: disable=F0401
+try:
+    from axosoft_api.aio import AsyncAxosoft
+except ImportError:
+    AsyncAxosoft = None
+
+from .standin import Options, StandInServer, make_items
+
+FORMAT_VERSION = 1
+ITEM_TYPE = 'defects'
+FAN_OUT_TYPES = ['defects', 'features', 'tasks', 'incidents']
+INDEX_QUERIES = ['crash', 'login slow', 'exp', 'ti', 'upload button']
+SERVING = re.compile(r'Serving on http://(\S+)/api with token (\w+)')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, fraction):
+    """ Nearest rank percentile of sorted samples. """
+    if not samples:
+        return None
+    rank = max(0, int(round(fraction * len(samples) + 0.5)) - 1)
+    return samples[min(rank, len(samples) - 1)]
+
+
+def summarize(name, samples, elapsed, **extra):
+    """ Latency percentiles in milliseconds and operations per second. """
+    samples = sorted(samples)
+    result = {
+        'name': name,
+        'count': len(samples),
+        'mean_ms': 1000 * sum(samples) / len(samples) if samples else None,
+        'min_ms': 1000 * samples[0] if samples else None,
+        'p50_ms': 1000 * percentile(samples, 0.50) if samples else None,
+        'p90_ms': 1000 * percentile(samples, 0.90) if samples else None,
+        'p99_ms': 1000 * percentile(samples, 0.99) if samples else None,
+        'max_ms': 1000 * samples[-1] if samples else None,
+        'ops_per_second': len(samples) / elapsed if elapsed else None
+    }
+    result.update(extra)
+    return result
+
+
+def measure(name, func, calls, **extra):
+    """ Time func once for each argument tuple in calls. """
+    samples = []
+    started = time.time()
+    for args in calls:
+        begin = time.time()
+        func(*args)
+        samples.append(time.time() - begin)
+    return summarize(name, samples, time.time() - started, **extra)
+
+
+def measure_once(name, func, **extra):
+    """ Time a single long running call, such as a whole listing. """
+    begin = time.time()
+    count = func()
+    elapsed = time.time() - begin
+    result = summarize(name, [elapsed], elapsed, **extra)
+    if count is not None:
+        result['items'] = count
+        result['items_per_second'] = count / elapsed if elapsed else None
+    return result
+
+
+def new_client(server, **kwargs):
+    """ A client talking to the stand-in with a fresh token. """
+    return Axosoft(
+        'benchmark',
+        'benchmark',
+        server.domain,
+        token=server.issue_token()['access_token'],
+        scheme='http',
+        **kwargs
+    )
+
+
+def run_client(server, iterations, page_size):
+    """ Latency of each verb and of full listings. """
+    client = new_client(server)
+    ids = sorted(server.data.resources[ITEM_TYPE])[:iterations]
+    payload = {'item': {'name': 'Benchmark item'}}
+    results = []
+
+    # Open the pool before timing anything
+    client.get('me')
+
+    results.append(measure(
+        'get',
+        client.get,
+        [(ITEM_TYPE, x) for x in ids]
+    ))
+    results.append(measure(
+        'get_columns',
+        lambda x: client.get(ITEM_TYPE, x, columns=True),
+        [(x,) for x in ids]
+    ))
+
+    created = []
+    results.append(measure(
+        'create',
+        lambda: created.append(client.create(ITEM_TYPE, payload)),
+        [()] * iterations
+    ))
+    created = [x['data']['id'] for x in created]
+    results.append(measure(
+        'update',
+        client.update,
+        [(ITEM_TYPE, x, payload) for x in created]
+    ))
+    results.append(measure(
+        'delete',
+        client.delete,
+        [(ITEM_TYPE, x) for x in created]
+    ))
+
+    for prefetch in (False, True):
+        results.append(measure_once(
+            'list_all{0}'.format('_prefetch' if prefetch else ''),
+            lambda: sum(1 for _ in client.iter_all(
+                ITEM_TYPE,
+                page_size=page_size,
+                prefetch=prefetch
+            )),
+            page_size=page_size
+        ))
+    results.append(measure_once(
+        'list_all_columns',
+        lambda: sum(1 for _ in client.iter_all(
+            ITEM_TYPE,
+            page_size=page_size,
+            columns=True
+        )),
+        page_size=page_size
+    ))
+    results.append(measure_once(
+        'list_stream',
+        lambda: sum(1 for _ in client.iter_stream(ITEM_TYPE))
+    ))
+    results.append(measure_once(
+        'bulk_update',
+        lambda: len(client.bulk_update(
+            ITEM_TYPE,
+            [(x, payload) for x in ids]
+        ))
+    ))
+
+    client.close()
+    return results
+
+
+def run_keep_alive(server, iterations):
+    """ Latency of gets with and without reusing connections. """
+    results = []
+    ids = sorted(server.data.resources[ITEM_TYPE])[:iterations]
+    for keep_alive in (True, False):
+        client = new_client(server, keep_alive=keep_alive)
+        client.get('me')
+        results.append(measure(
+            'get_keep_alive_{0}'.format('on' if keep_alive else 'off'),
+            client.get,
+            [(ITEM_TYPE, x) for x in ids]
+        ))
+        client.close()
+    return results
+
+
+def run_payload(server, page_size):
+    """ Bytes of one page of a list with and without projection. """
+    client = new_client(server)
+    results = []
+    for columns in (None, True):
+        page = client.get(
+            ITEM_TYPE,
+            payload={'page': 1, 'page_size': page_size},
+            columns=columns
+        )
+        results.append({
+            'name': 'page_bytes{0}'.format('_columns' if columns else ''),
+            'count': 1,
+            'bytes': len(json.dumps(page)),
+            'page_size': page_size
+        })
+    client.close()
+    return results
+
+
+def run_fan_out(server, iterations, page_size):
+    """ First page of every item type, one after another and gathered. """
+    payload = {'page': 1, 'page_size': page_size}
+    client = new_client(server)
+    client.get('me')
+    results = [measure(
+        'fan_out_sync',
+        lambda: [
+            client.get(x, payload=payload, columns=True)
+            for x in FAN_OUT_TYPES
+        ],
+        [()] * iterations
+    )]
+    client.close()
+    if AsyncAxosoft is None:
+        return results
+
+    async def fan_out():
+        """ Time the gathered fan-outs inside the loop. """
+        async with AsyncAxosoft(
+                'benchmark',
+                'benchmark',
+                server.domain,
+                token=server.issue_token()['access_token'],
+                scheme='http') as async_client:
+            await async_client.get('me')
+            samples = []
+            started = time.time()
+            for _ in range(iterations):
+                begin = time.time()
+                await asyncio.gather(*[
+                    async_client.get(x, payload=payload, columns=True)
+                    for x in FAN_OUT_TYPES
+                ])
+                samples.append(time.time() - begin)
+            return summarize('fan_out_async', samples, time.time() - started)
+
+    loop = asyncio.new_event_loop()
+    try:
+        results.append(loop.run_until_complete(fan_out()))
+    finally:
+        loop.close()
+    return results
+
+
+def run_refresh(iterations, lifetime):
+    """
+    Latency of gets while short lived tokens keep expiring.
+
+    The client refreshes each token before it expires, so no request is
+    rejected and only the request that refreshes pays for it.
+    """
+    server = StandInServer(options=Options(token_lifetime=lifetime)).start()
+    refreshed = []
+    try:
+        token = server.issue_token()
+        client = Axosoft(
+            'benchmark',
+            'benchmark',
+            server.domain,
+            token=token['access_token'],
+            scheme='http',
+            refresh_token=token['refresh_token'],
+            token_expires=time.time() + token['expires_in'],
+            refresh_margin=lifetime / 2.0,
+            on_token=refreshed.append
+        )
+        client.get('me')
+        ids = sorted(server.data.resources[ITEM_TYPE])
+        samples = []
+        started = time.time()
+        for index in range(iterations):
+            # Spread the gets over a few token lifetimes
+            time.sleep(4.0 * lifetime / iterations)
+            begin = time.time()
+            client.get(ITEM_TYPE, ids[index % len(ids)])
+            samples.append(time.time() - begin)
+        result = summarize('get_refreshing', samples, time.time() - started)
+        result['refreshes'] = len(refreshed)
+        client.close()
+    finally:
+        server.stop()
+    return [result]
+
+
+def run_memory(count, page_size):
+    """
+    Memory held by the item list of a long listing.
+
+    Compares keeping every full item, as the list used to, with keeping
+    projected summaries and loading the detail on demand.
+    """
+    server = StandInServer(options=Options(items=count)).start()
+    results = []
+    try:
+        client = new_client(server)
+        for name, columns in (('full', None), ('summaries', True)):
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            items = [
+                summary(ITEM_TYPE, x) if columns else x
+                for x in client.iter_all(
+                    ITEM_TYPE,
+                    page_size=page_size,
+                    columns=columns
+                )
+            ]
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                'name': 'list_memory_{0}'.format(name),
+                'count': 1,
+                'items': len(items),
+                'retained_bytes': retained - before,
+                'peak_bytes': peak - before
+            })
+            del items
+        client.close()
+    finally:
+        server.stop()
+    return results
+
+
+def run_stream(count, description_size):
+    """
+    Time and peak memory of reading one multi-MB list response.
+
+    Compares decoding items as the body arrives, keeping one at a time,
+    with decoding the whole body at once. The stand-in runs in a process
+    of its own so the memory it uses to build the response isn't traced.
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable, '-u', '-m', 'benchmarks.standin',
+            '--port', '0',
+            '--items', str(count),
+            '--description-size', str(description_size)
+        ],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        universal_newlines=True
+    )
+    results = []
+    try:
+        domain, token = SERVING.match(process.stdout.readline()).groups()
+        records = []
+        client = Axosoft('benchmark', 'benchmark', domain, token=token,
+                         scheme='http', hooks=[records.append])
+        client.get('me')
+        readers = (
+            ('stream', lambda: sum(1 for _ in client.iter_stream(ITEM_TYPE))),
+            ('decode', lambda: len(client.get(ITEM_TYPE)['data']))
+        )
+        for name, read in readers:
+            result = measure_once('large_list_{0}'.format(name), read)
+            result['body_bytes'] = records[-1].bytes_in
+
+            # Traced separately, tracing slows everything down
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            read()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1] - before
+            tracemalloc.stop()
+            results.append(result)
+        client.close()
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def run_index(count, description_size):
+    """ Build and query time of the search index. """
+    items = list(make_items(ITEM_TYPE, count, description_size))
+    for item_id, item in enumerate(items, 1):
+        item['id'] = item_id
+    index = SearchIndex(ITEM_TYPE)
+    results = [measure_once(
+        'index_build',
+        lambda: index.add(items) or len(index)
+    )]
+    results.append(measure(
+        'index_search',
+        index.search,
+        [(query, 50) for query in INDEX_QUERIES * 20]
+    ))
+    return results
+
+
+def main():
+    """ Run every benchmark and print or save the results. """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--items', type=int, default=2000,
+                        help='items of each type on the stand-in')
+    parser.add_argument('--description-size', type=int, default=200,
+                        help='characters in each item description')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the stand-in adds to every request')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with a 503')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='calls timed for each single item benchmark')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--memory-items', type=int, default=20000,
+                        help='items listed by the memory benchmark')
+    parser.add_argument('--stream-items', type=int, default=5000,
+                        help='items in the large list response')
+    parser.add_argument('--stream-description-size', type=int,
+                        default=2000,
+                        help='description characters in the large list')
+    parser.add_argument('--index-items', type=int, default=100000,
+                        help='items indexed by the search index benchmark')
+    parser.add_argument('--token-lifetime', type=float, default=1.0,
+                        help='seconds a token lives in the refresh benchmark')
+    parser.add_argument('--output', help='write the results to this file')
+    args = parser.parse_args()
+
+    options = Options(
+        items=max(args.items, args.iterations),
+        description_size=args.description_size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        retry_after=0
+    )
+    server = StandInServer(options=options).start()
+    try:
+        results = run_client(server, args.iterations, args.page_size)
+        results += run_keep_alive(server, args.iterations)
+        results += run_payload(server, args.page_size)
+        results += run_fan_out(server, args.iterations, args.page_size)
+    finally:
+        server.stop()
+
+    results += run_refresh(args.iterations, args.token_lifetime)
+    results += run_memory(args.memory_items, args.page_size)
+    results += run_stream(args.stream_items, args.stream_description_size)
+    results += run_index(args.index_items, args.description_size)
+
+    report = {
+        'version': FORMAT_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': vars(args),
+        'results': results
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+"""
+Stand-in.
+
+A local HTTP server that behaves like the parts of the Axosoft API used by
+axosoft_api, for offline benchmarks and manual testing.
+
+    python -m benchmarks.standin --port 8080 --items 5000 --latency 0.02
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+from axosoft_api.config import RESOURCES
+
+ITEM_TYPES = ['defects', 'features', 'tasks', 'incidents']
+USER = {'id': 1, 'first_name': 'Stand', 'last_name': 'In'}
+JSON_TYPE = 'application/json; charset=utf-8'
+UPDATED_FIELD = 'last_updated_date_time'
+# The operators of a filters parameter, compared as text like ISO dates
+FILTER = re.compile(r'(\w+)=(eq|ne|gt|ge|lt|le)"([^"]*)"')
+FILTER_OPERATORS = {
+    'eq': lambda x, y: x == y,
+    'ne': lambda x, y: x != y,
+    'gt': lambda x, y: x > y,
+    'ge': lambda x, y: x >= y,
+    'lt': lambda x, y: x < y,
+    'le': lambda x, y: x <= y
+}
+WORDS = ['crash', 'save', 'login', 'report', 'export', 'slow', 'timeout',
+         'button', 'layout', 'sync', 'upload', 'email']
+
+
+class Options(object):
+
+    """ How the stand-in behaves."""
+
+    def __init__(self, items=1000, description_size=200, latency=0.0,
+                 error_rate=0.0, retry_after=None, token_lifetime=3600):
+        """ Init. """
+        self.items = items
+        self.description_size = description_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.token_lifetime = token_lifetime
+
+
+def make_items(item_type, count, description_size):
+    """ Synthetic items with random names and a fixed size description. """
+    filler = ' '.join(WORDS) + ' '
+    description = (filler * (description_size // len(filler) + 1))
+    description = '<p>{0}</p>'.format(description[:description_size])
+    for _ in range(count):
+        yield {
+            'name': ' '.join(random.sample(WORDS, 3)),
+            'item_type': item_type,
+            'description': description,
+            'assigned_to': {'id': USER['id'], 'type': 'user'},
+            'custom_fields': {'custom_1': random.choice(WORDS)},
+            'last_updated_date_time': '2016-01-01T00:00:00Z'
+        }
+
+
+class Data(object):
+
+    """ The resources served by the stand-in."""
+
+    def __init__(self, options):
+        """ Init. """
+        self.lock = threading.Lock()
+        self.resources = dict((address, {}) for address in RESOURCES)
+        self.tokens = {}
+        self.refresh_tokens = {}
+        self.attachments = {}
+        self.next_id = 1
+        self.clock = 0
+        for item_type in ITEM_TYPES:
+            for item in make_items(item_type, options.items,
+                                   options.description_size):
+                self.add(item_type, item)
+        for project_id in range(1, 6):
+            self.resources['projects'][project_id] = {
+                'id': project_id,
+                'name': 'Project {0}'.format(project_id),
+                'children': []
+            }
+        self.resources['picklists'] = {
+            'priority': [{'id': 1, 'name': 'High'}, {'id': 2, 'name': 'Low'}]
+        }
+        for step_id in range(1, 4):
+            self.resources['workflow_steps'][step_id] = {
+                'id': step_id,
+                'name': 'Step {0}'.format(step_id)
+            }
+
+    def add(self, address, item):
+        """ Store a new resource and return it. """
+        item = dict(item)
+        item['id'] = self.next_id
+        self.next_id += 1
+        self.touch(item)
+        self.resources[address][item['id']] = item
+        return item
+
+    def touch(self, item):
+        """ Mark an item updated, each later than the one before. """
+        self.clock += 1
+        item[UPDATED_FIELD] = time.strftime(
+            '%Y-%m-%dT%H:%M:%SZ',
+            time.gmtime(1451606400 + self.clock)
+        )
+
+    def issue_token(self, lifetime):
+        """ Issue a new access and refresh token. """
+        access_token = uuid.uuid4().hex
+        refresh_token = uuid.uuid4().hex
+        self.tokens[access_token] = time.time() + lifetime
+        self.refresh_tokens[refresh_token] = access_token
+        return {
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'token_type': 'bearer',
+            'expires_in': lifetime
+        }
+
+
+def _filter(items, filters):
+    """ Keep the items matching every condition of a filters parameter. """
+    for field, operator, value in FILTER.findall(filters):
+        compare = FILTER_OPERATORS[operator]
+        items = [
+            x for x in items if compare(str(x.get(field) or ''), value)
+        ]
+    return items
+
+
+def _project(item, columns):
+    """ Keep only the requested columns of an item. """
+    if not columns:
+        return item
+    return dict((x, item[x]) for x in columns if x in item)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    """ Serve one request."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'AxosoftStandIn/1.0'
+    # Headers and body are written separately, don't let Nagle delay them
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        """ Stay quiet. """
+        pass
+
+    def __send(self, code, body, headers=None):
+        """ Send a JSON response. """
+        self.__send_raw(code, json.dumps(body), JSON_TYPE, headers)
+
+    def __send_raw(self, code, body, content_type, headers=None):
+        """ Send a response with any body. """
+        content = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def __body(self):
+        """ Read the request body, once. """
+        if getattr(self, 'body', None) is None:
+            length = int(self.headers.get('Content-Length') or 0)
+            self.body = self.rfile.read(length) if length else b''
+        return self.body
+
+    def __route(self):
+        """
+        Split the path into (address, id, element).
+
+        Returns None for paths outside the API.
+        """
+        path = urlparse(self.path).path.strip('/').split('/')
+        if len(path) < 3 or path[0] != 'api' or not path[1].startswith('v'):
+            return None
+        path = path[2:]
+        if len(path) > 1 and '/'.join(path[:2]) in RESOURCES:
+            path = ['/'.join(path[:2])] + path[2:]
+        address = path[0]
+        resource_id = path[1] if len(path) > 1 else None
+        element = path[2] if len(path) > 2 else None
+        return address, resource_id, element
+
+    def __prepare(self):
+        """
+        Apply latency, error injection and authentication.
+
+        Returns False when a response was already sent.
+        """
+        options = self.server.options
+        # Read the body even when failing, the connection is reused
+        self.body = None
+        self.__body()
+        fault = self.server.record(self.command, self.path)
+        if options.latency:
+            time.sleep(options.latency)
+        if fault is not None:
+            time.sleep(fault['delay'])
+            self.__send_raw(
+                fault['code'],
+                fault['body'],
+                fault['content_type'],
+                fault['headers']
+            )
+            return False
+        if options.error_rate and random.random() < options.error_rate:
+            headers = {}
+            if options.retry_after is not None:
+                headers['Retry-After'] = str(options.retry_after)
+            self.__send(503, {'error': 'unavailable'}, headers)
+            return False
+
+        if urlparse(self.path).path.endswith('/oauth2/token'):
+            return True
+
+        token = (self.headers.get('Authorization') or '')[len('Bearer '):]
+        expires = self.server.data.tokens.get(token)
+        if expires is None or expires < time.time():
+            self.__send(401, {
+                'error': 'invalid_token',
+                'error_description': 'The access token is not valid'
+            })
+            return False
+        return True
+
+    def __token(self):
+        """ The OAuth token endpoint. """
+        params = parse_qs(self.__body().decode('utf-8'))
+        grant_type = params.get('grant_type', [None])[0]
+        data = self.server.data
+        with data.lock:
+            if grant_type == 'refresh_token':
+                refresh_token = params.get('refresh_token', [None])[0]
+                old = data.refresh_tokens.pop(refresh_token, None)
+                if old is None:
+                    return self.__send(400, {
+                        'error': 'invalid_grant',
+                        'error_description': 'Unknown refresh token'
+                    })
+                data.tokens.pop(old, None)
+            elif grant_type not in ('password', 'authorization_code'):
+                return self.__send(400, {
+                    'error': 'unsupported_grant_type',
+                    'error_description': 'Unsupported grant type'
+                })
+            token = data.issue_token(self.server.options.token_lifetime)
+        self.__send(200, token)
+
+    def __attachment_data(self, attachment_id):
+        """ The data of an attachment, honouring a Range header. """
+        with self.server.data.lock:
+            attachment = self.server.data.attachments.get(int(attachment_id))
+        if attachment is None:
+            return self.__send(404, {'error': 'not found'})
+        content = attachment['content']
+        start = 0
+        code = 200
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range') or '')
+        if match:
+            start = int(match.group(1))
+            if start >= len(content):
+                return self.__send(416, {'error': 'range not satisfiable'})
+            code = 206
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content) - start))
+        if code == 206:
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(
+                start,
+                len(content) - 1,
+                len(content)
+            ))
+        self.end_headers()
+        cut = self.server.next_cut()
+        if cut is not None:
+            self.wfile.write(content[start:start + cut])
+            self.close_connection = True
+            return
+        self.wfile.write(content[start:])
+
+    def __upload(self, address, resource_id):
+        """ Store the body as an attachment of a resource. """
+        query = parse_qs(urlparse(self.path).query)
+        content = self.__body()
+        data = self.server.data
+        with data.lock:
+            if int(resource_id) not in data.resources[address]:
+                return self.__send(404, {'error': 'not found'})
+            attachment = {
+                'id': data.next_id,
+                'name': query.get('file_name', ['attachment'])[0],
+                'size': len(content),
+                'address': address,
+                'resource_id': int(resource_id)
+            }
+            data.next_id += 1
+            data.attachments[attachment['id']] = dict(
+                attachment,
+                content=content
+            )
+        self.__send(201, {'data': attachment})
+
+    def do_GET(self):
+        """ Get a resource or a page of a list. """
+        if not self.__prepare():
+            return
+        route = self.__route()
+        if route is None or route[0] not in RESOURCES:
+            return self.__send(404, {'error': 'not found'})
+        address, resource_id, element = route
+        query = parse_qs(urlparse(self.path).query)
+        columns = query.get('columns', [''])[0]
+        columns = columns.split(',') if columns else None
+
+        data = self.server.data
+        if address == 'attachments' and element == 'data':
+            return self.__attachment_data(resource_id)
+        if element == 'attachments':
+            with data.lock:
+                attachments = [
+                    dict((k, v) for k, v in x.items() if k != 'content')
+                    for x in data.attachments.values()
+                    if x['address'] == address
+                    and x['resource_id'] == int(resource_id)
+                ]
+            return self.__send(200, {'data': attachments})
+        if address == 'me':
+            return self.__send(200, {'data': USER})
+        if address == 'picklists':
+            return self.__send(200, {'data': data.resources['picklists']})
+
+        with data.lock:
+            if resource_id is not None:
+                item = data.resources[address].get(int(resource_id))
+                if item is None:
+                    return self.__send(404, {'error': 'not found'})
+                if element is not None:
+                    return self.__send(200, {'data': []})
+                return self.__send(200, {'data': _project(item, columns)})
+            items = list(data.resources[address].values())
+
+        filters = query.get('filters', [None])[0]
+        if filters:
+            items = _filter(items, filters)
+
+        search = query.get('search_string', [None])[0]
+        if search:
+            items = [
+                x for x in items
+                if search.lower() in str(x.get('name', '')).lower()
+                or str(x['id']) == search
+            ]
+
+        page_size = int(query.get('page_size', [len(items) or 1])[0])
+        page = int(query.get('page', [1])[0])
+        total_pages = max(1, (len(items) + page_size - 1) // page_size)
+        page_items = [
+            _project(x, columns)
+            for x in items[(page - 1) * page_size:page * page_size]
+        ]
+        body = {
+            'data': page_items,
+            'metadata': {
+                'page': page,
+                'page_size': page_size,
+                'total_pages': total_pages,
+                'total_count': len(items)
+            }
+        }
+
+        etag = '"{0}"'.format(
+            hashlib.md5(json.dumps(body).encode('utf-8')).hexdigest()
+        )
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.__send(200, body, {'ETag': etag})
+
+    def do_POST(self):
+        """ Create or update a resource, or issue a token. """
+        if not self.__prepare():
+            return
+        if urlparse(self.path).path.endswith('/oauth2/token'):
+            return self.__token()
+        route = self.__route()
+        if route is None or route[0] not in RESOURCES:
+            return self.__send(404, {'error': 'not found'})
+        address, resource_id, element = route
+        if element == 'attachments':
+            return self.__upload(address, resource_id)
+
+        try:
+            payload = json.loads(self.__body().decode('utf-8') or '{}')
+        except ValueError:
+            return self.__send(400, {'error_description': 'Invalid JSON'})
+        fields = payload.get('item', payload)
+
+        data = self.server.data
+        with data.lock:
+            if resource_id is None:
+                return self.__send(201, {'data': data.add(address, fields)})
+            item = data.resources[address].get(int(resource_id))
+            if item is None:
+                return self.__send(404, {'error': 'not found'})
+            if element is not None:
+                return self.__send(201, {'data': fields})
+            item.update(fields)
+            data.touch(item)
+            return self.__send(200, {'data': item})
+
+    def do_DELETE(self):
+        """ Delete a resource. """
+        if not self.__prepare():
+            return
+        route = self.__route()
+        if route is None or route[0] not in RESOURCES or route[1] is None:
+            return self.__send(404, {'error': 'not found'})
+        address, resource_id = route[:2]
+        with self.server.data.lock:
+            item = self.server.data.resources[address].pop(
+                int(resource_id),
+                None
+            )
+        if item is None:
+            return self.__send(404, {'error': 'not found'})
+        self.__send(200, {'data': {}})
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+
+    """ The stand-in server, run it in a thread with start."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, options=None):
+        """ Init. """
+        HTTPServer.__init__(self, ('127.0.0.1', port), Handler)
+        self.options = options or Options()
+        self.data = Data(self.options)
+        self.requests = []
+        self.__faults = []
+        self.__cuts = []
+        self.__thread = None
+
+    def inject(self, code=503, count=1, body=None, content_type=JSON_TYPE,
+               headers=None, delay=0.0):
+        """
+        Answer the next count requests with an error.
+
+        body is sent as is, by default a JSON error. delay holds the
+        response back that many seconds, longer than a client's timeout
+        to simulate a hung connection.
+        """
+        if body is None:
+            body = json.dumps({'error': 'injected'})
+        with self.data.lock:
+            self.__faults += [{
+                'code': code,
+                'body': body,
+                'content_type': content_type,
+                'headers': headers or {},
+                'delay': delay
+            }] * count
+
+    def cut(self, after, count=1):
+        """
+        Drop the connection of the next count attachment downloads.
+
+        Each sends its headers and only after bytes of its body, as if the
+        connection was lost mid transfer.
+        """
+        with self.data.lock:
+            self.__cuts += [after] * count
+
+    def next_cut(self):
+        """ Bytes to send of the next download, None for all of them. """
+        with self.data.lock:
+            return self.__cuts.pop(0) if self.__cuts else None
+
+    def record(self, verb, path):
+        """ Log a request, returns the fault to answer it with if any. """
+        with self.data.lock:
+            self.requests.append((verb, urlparse(path).path))
+            return self.__faults.pop(0) if self.__faults else None
+
+    @property
+    def domain(self):
+        """ host:port to hand to the Axosoft client. """
+        return '127.0.0.1:{0}'.format(self.server_address[1])
+
+    def issue_token(self):
+        """ A valid token, as if the user had just logged in. """
+        with self.data.lock:
+            return self.data.issue_token(self.options.token_lifetime)
+
+    def start(self):
+        """ Serve in a background thread. """
+        self.__thread = threading.Thread(
+            target=self.serve_forever,
+            # Stop quickly, tests start and stop a server each
+            kwargs={'poll_interval': 0.05}
+        )
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """ Stop serving. """
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    """ Run the stand-in in the foreground. """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--items', type=int, default=1000,
+                        help='items of each type')
+    parser.add_argument('--description-size', type=int, default=200,
+                        help='characters in each item description')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every request')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with a 503')
+    parser.add_argument('--retry-after', type=int, default=None,
+                        help='Retry-After sent with injected errors')
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, Options(
+        items=args.items,
+        description_size=args.description_size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after
+    ))
+    print('Serving on http://{0}/api with token {1}'.format(
+        server.domain,
+        server.issue_token()['access_token']
+    ))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
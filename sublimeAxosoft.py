@@ -7,35 +7,521 @@ A Sublime Text 3 plug-in for managing issues in Axosoft.
 import sublime
 import sublime_plugin
 import json
-import re
+import os
 import datetime
 import webbrowser
+from collections import OrderedDict
 from .AxosoftConfig import CONFIG
-from .axosoft_api import Axosoft
+from .axosoft_api import Axosoft, AuthenticationError, DEFAULT_CONCURRENCY, \
+    summary
+from .axosoft_api.cache import LRUCache, ResponseCache
+from .axosoft_api.diff import diff
+from .axosoft_api.executor import Executor
+from .axosoft_api.journal import WriteQueue
+from .axosoft_api.metadata import MetadataCache
+from .axosoft_api.retry import RetryPolicy, TokenBucket
+from .axosoft_api.search import SearchIndex
+from .axosoft_api.stats import RequestStats
+from .axosoft_api.store import ItemStore, sqlite3
+
+RUNNING = {}
+INDEXES = {}
+ITEM_VIEWS = {}
+PROGRESS = {'jobs': {}, 'frame': 0}
+WRITES = {'callbacks': {}, 'scheduled': False}
+# Bumped whenever the token changes, so only the latest timer refreshes it
+REFRESH = {'generation': 0}
+SEARCH_LIMIT = 50
+SEARCH_HISTORY = 32
+ITEM_TYPE_NAMES = {
+    'Custom Items': 'tasks',
+    'Defects': 'defects',
+    'Incidents': 'incidents',
+    'User Stories': 'features'
+}
 
 
 def plugin_loaded():
     """ Some Setup. """
     CONFIG['settings'] = sublime.load_settings(CONFIG["file"])
+    cache_size = CONFIG['settings'].get('axosoft_cache_size', 0)
+    rate_limit = CONFIG['settings'].get('axosoft_rate_limit', 0)
+    CONFIG['stats'] = RequestStats(
+        CONFIG['settings'].get('axosoft_stats_export') or None
+    )
+    if 'client' in CONFIG:
+        CONFIG.pop('client').close()
     CONFIG["client"] = Axosoft(
         CONFIG["clientId"],
         CONFIG["clientSecret"],
         CONFIG["settings"].get('axosoft_domain'),
-        CONFIG["settings"].get('accessToken', None)
+        CONFIG["settings"].get('accessToken', None),
+        cache=ResponseCache(cache_size) if cache_size else None,
+        retry=RetryPolicy(CONFIG['settings'].get('axosoft_max_retries', 3)),
+        timeout=CONFIG['settings'].get('axosoft_timeout', 60),
+        rate_limiter=TokenBucket(rate_limit) if rate_limit else None,
+        hooks=[CONFIG['stats']],
+        refresh_token=CONFIG['settings'].get('refreshToken', None),
+        token_expires=CONFIG['settings'].get('tokenExpires', None),
+        on_token=lambda credentials: sublime.set_timeout(
+            lambda: save_credentials(credentials),
+            0
+        )
+    )
+    CONFIG['details'] = LRUCache(
+        CONFIG['settings'].get('axosoft_detail_cache_size', 1048576)
+    )
+    if 'executor' not in CONFIG:
+        CONFIG['executor'] = Executor(
+            CONFIG['settings'].get('axosoft_max_workers', 4)
+        )
+    if 'sync_executor' not in CONFIG:
+        # Downloads of whole item types never hold up commands
+        CONFIG['sync_executor'] = Executor(1)
+    if 'write_executor' not in CONFIG:
+        # A flush waits for its batches, they can't share its pool
+        CONFIG['write_executor'] = Executor(DEFAULT_CONCURRENCY)
+    if 'store' in CONFIG:
+        CONFIG.pop('store').close()
+    if (sqlite3 is not None
+            and CONFIG['settings'].get('axosoft_local_store', True)):
+        CONFIG['store'] = ItemStore(
+            cache_file('{0}.sqlite'.format(
+                CONFIG['settings'].get('axosoft_domain')
+            ))
+        )
+    CONFIG['metadata'] = MetadataCache(
+        CONFIG['client'],
+        cache_file('{0}.metadata.json'.format(
+            CONFIG['settings'].get('axosoft_domain')
+        )),
+        CONFIG['settings'].get('axosoft_domain')
+    )
+    if CONFIG['metadata'].me() is not None:
+        open_writes(CONFIG['metadata'].me())
+    else:
+        CONFIG.pop('writes', None)
+    # Let Sublime finish starting before any requests are made
+    sublime.set_timeout(
+        lambda: dispatch(
+            'warm_up',
+            'Warming up',
+            warm_up,
+            on_error=lambda error: None
+        ),
+        0
+    )
+    # Send whatever was left queued by the last session
+    sublime.set_timeout(flush_writes, 0)
+    schedule_refresh()
+
+
+def warm_up():
+    """ Prefetch what the first commands need, runs in the background. """
+    if CONFIG['settings'].get('axosoft_warm_up', True):
+        CONFIG['client'].warm_up()
+        CONFIG['metadata'].refresh()
+
+
+def cache_file(name):
+    """ Path of a file in the package's cache directory. """
+    path = os.path.join(sublime.cache_path(), CONFIG['name'])
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return os.path.join(path, name)
+
+
+def plugin_unloaded():
+    """ Stop the background workers. """
+    if 'client' in CONFIG:
+        CONFIG['client'].close()
+    for name in ('executor', 'sync_executor', 'write_executor'):
+        if name in CONFIG:
+            CONFIG.pop(name).shutdown()
+    if 'store' in CONFIG:
+        CONFIG.pop('store').close()
+
+
+def save_credentials(credentials):
+    """ Store a new token, its refresh token and expiry in one save. """
+    settings = CONFIG['settings']
+    for key, name in (('accessToken', 'access_token'),
+                      ('refreshToken', 'refresh_token'),
+                      ('tokenExpires', 'expires')):
+        if credentials[name] is None:
+            settings.erase(key)
+        else:
+            settings.set(key, credentials[name])
+    sublime.save_settings(CONFIG['file'])
+    schedule_refresh()
+
+
+def schedule_refresh():
+    """ Refresh the token in the background shortly before it expires. """
+    REFRESH['generation'] += 1
+    delay = CONFIG['client'].refresh_delay()
+    if delay is None:
+        return
+    generation = REFRESH['generation']
+
+    def refresh():
+        """ Unless the token changed since. """
+        if generation == REFRESH['generation']:
+            dispatch(
+                'refresh',
+                'Refreshing login',
+                CONFIG['client'].refresh_if_due,
+                # Requests refresh it themselves if this failed
+                on_error=lambda error: None
+            )
+
+    sublime.set_timeout(refresh, int(delay * 1000))
+
+
+def prompt_auth(window):
+    """ Send the user back through authentication. """
+    sublime.message_dialog(
+        'You must authenticate with your Axosoft API first.'
+    )
+    window.run_command('axosoft_auth')
+
+
+def show_error(error):
+    """ Default handler for errors raised by background work. """
+    if isinstance(error, AuthenticationError):
+        prompt_auth(sublime.active_window())
+    else:
+        sublime.error_message('Axosoft: {0}'.format(error))
+
+
+def show_progress():
+    """ Animate the status bar while background work is running. """
+    window = sublime.active_window()
+    view = window.active_view() if window is not None else None
+    if not PROGRESS['jobs']:
+        if view is not None:
+            view.erase_status('axosoft')
+        return
+
+    frame = PROGRESS['frame'] % 6
+    message = list(PROGRESS['jobs'].values())[-1]
+    if view is not None:
+        view.set_status(
+            'axosoft',
+            'Axosoft: {0} [{1}={2}]'.format(
+                message,
+                ' ' * frame,
+                ' ' * (5 - frame)
+            )
+        )
+    PROGRESS['frame'] += 1
+    sublime.set_timeout(show_progress, 100)
+
+
+def cancel(key):
+    """ Cancel the running job dispatched with key. """
+    if key in RUNNING:
+        job = RUNNING.pop(key)
+        job.cancel()
+        PROGRESS['jobs'].pop(job, None)
+
+
+def dispatch(key, message, func, *args, **kwargs):
+    """
+    Run func on the background executor.
+
+    on_done and on_error are called on the UI thread. Dispatching again with
+    the same key cancels the earlier job, a key of None is never cancelled.
+    executor is the pool to run on, the shared one by default.
+    """
+    on_done = kwargs.pop('on_done', None)
+    on_error = kwargs.pop('on_error', show_error)
+    executor = kwargs.pop('executor', None) or CONFIG['executor']
+    holder = {}
+
+    def finish(callback, value):
+        """ Back on the UI thread. """
+        job = holder['job']
+        PROGRESS['jobs'].pop(job, None)
+        if job.cancelled():
+            return
+        if RUNNING.get(key) is job:
+            del RUNNING[key]
+        if callback is not None:
+            callback(value)
+
+    def marshal(callback):
+        """ Hand a value from the worker over to the UI thread. """
+        return lambda value: sublime.set_timeout(
+            lambda: finish(callback, value),
+            0
+        )
+
+    if key is not None:
+        cancel(key)
+
+    job = executor.submit(
+        func,
+        *args,
+        on_done=marshal(on_done),
+        on_error=marshal(on_error),
+        **kwargs
+    )
+    holder['job'] = job
+    if key is not None:
+        RUNNING[key] = job
+
+    start = not PROGRESS['jobs']
+    PROGRESS['jobs'][job] = message
+    if start:
+        show_progress()
+
+    return job
+
+
+def open_writes(me):
+    """
+    The write queue of a user.
+
+    Each user has their own journal, so nothing is sent with the token of
+    whoever logs in next, and a journal is only ever open in one queue.
+    """
+    path = cache_file('{0}.{1}.journal'.format(
+        CONFIG['settings'].get('axosoft_domain'),
+        me['id']
+    ))
+    writes = CONFIG.get('writes')
+    if writes is None or writes.path() != path:
+        writes = CONFIG['writes'] = WriteQueue(
+            CONFIG['client'],
+            path,
+            CONFIG['write_executor']
+        )
+    else:
+        writes.set_client(CONFIG['client'])
+    return writes
+
+
+def queue_write(verb, *args, **kwargs):
+    """
+    Queue a create, update or delete and send it in the background.
+
+    on_queued is called once the write is on disk. on_done is called with
+    the response once it was sent, if that happens before Sublime is
+    closed.
+    """
+    on_done = kwargs.pop('on_done', None)
+    on_queued = kwargs.pop('on_queued', None)
+
+    def add(me):
+        """ Into the journal of the current user. """
+        try:
+            key = getattr(open_writes(me), verb)(*args)
+        except (LookupError, ValueError) as error:
+            show_error(error)
+            return
+        if on_done is not None:
+            WRITES['callbacks'][key] = on_done
+        if on_queued is not None:
+            on_queued()
+        flush_writes()
+
+    with_metadata('me', 'Loading user', add)
+
+
+def flush_writes():
+    """ Send the queued writes. """
+    WRITES['scheduled'] = False
+    writes = CONFIG.get('writes')
+    if writes is not None and len(writes):
+        # Not keyed, a running flush picks up new writes by itself
+        dispatch(
+            None,
+            'Saving {0} changes'.format(len(writes)),
+            writes.flush,
+            on_finished=lambda finished: sublime.set_timeout(
+                lambda: writes_flushed(finished),
+                0
+            )
+        )
+
+
+def writes_flushed(finished):
+    """ Report what was sent and try again later if anything is left. """
+    rejected = []
+    for write, result in finished:
+        callback = WRITES['callbacks'].pop(write['key'], None)
+        if not result.success:
+            rejected.append('{0} {1} {2}: {3}'.format(
+                write['verb'],
+                write['address'],
+                write['resource_id'] or '',
+                result.error
+            ))
+        elif callback is not None:
+            callback(result.data)
+    if rejected:
+        sublime.error_message(
+            'Axosoft rejected {0} changes:\n{1}'.format(
+                len(rejected),
+                '\n'.join(rejected)
+            )
+        )
+
+    writes = CONFIG.get('writes')
+    delay = writes.retry_delay() if writes is not None else None
+    if delay is not None and not WRITES['scheduled']:
+        WRITES['scheduled'] = True
+        sublime.set_timeout(flush_writes, int(delay * 1000))
+
+
+def with_metadata(address, message, on_done):
+    """
+    Hand the cached reference data of address to on_done.
+
+    Missing data is fetched first, stale data is used straight away and
+    refreshed in the background. When missing data can't be fetched,
+    on_done isn't called, the error is shown or, without a token, the
+    login prompt.
+    """
+    metadata = CONFIG['metadata']
+    data = metadata.get(address)
+    if data is None:
+        dispatch(None, message, metadata.fetch, address, on_done=on_done)
+        return
+
+    on_done(data)
+    if metadata.stale(address):
+        dispatch(
+            ('metadata', address),
+            'Refreshing {0}'.format(address),
+            metadata.refresh,
+            [address],
+            on_error=lambda error: None
+        )
+
+
+def transfer_progress(message):
+    """
+    An on_progress callback showing the percentage of a transfer.
+
+    Returns a dict and the callback, put the dispatched job in the dict
+    under 'job' so the callback knows which status message to update.
+    """
+    holder = {'percent': None}
+
+    def update(text):
+        """ On the UI thread. """
+        job = holder.get('job')
+        if job in PROGRESS['jobs']:
+            PROGRESS['jobs'][job] = text
+
+    def on_progress(done, total):
+        """ Called by the worker after every chunk. """
+        percent = 100 * done // total if total else done // (1024 * 1024)
+        if percent == holder['percent']:
+            return
+        holder['percent'] = percent
+        text = '{0} {1}{2}'.format(message, percent, '%' if total else ' MB')
+        sublime.set_timeout(lambda: update(text), 0)
+
+    return holder, on_progress
+
+
+def pick_item(window, caption, on_done, item_type=None, item_id=None):
+    """ Ask for whatever of an item type and id is missing. """
+    if item_type is None:
+        names = sorted(ITEM_TYPE_NAMES)
+
+        def on_select(idx):
+            """ Ask for the id once the panel has closed. """
+            if idx != -1:
+                sublime.set_timeout(
+                    lambda: pick_item(
+                        window,
+                        caption,
+                        on_done,
+                        ITEM_TYPE_NAMES[names[idx]],
+                        item_id
+                    ),
+                    20
+                )
+
+        window.show_quick_panel(names, on_select)
+    elif item_id is None:
+        window.show_input_panel(
+            caption,
+            '',
+            lambda text: on_done(item_type, text.strip().lstrip('#')),
+            None,
+            None
+        )
+    else:
+        on_done(item_type, item_id)
+
+
+def forget_details(item_type, item_ids):
+    """ Drop the cached detail of items that were changed or deleted. """
+    for item_id in item_ids:
+        CONFIG['details'].pop((item_type, item_id))
+
+
+def search_index(item_type):
+    """
+    The search index of an item type.
+
+    A missing index is created empty and filled from the local store in the
+    background.
+    """
+    if item_type not in INDEXES:
+        index = INDEXES[item_type] = SearchIndex(item_type)
+        if 'store' in CONFIG:
+            store = CONFIG['store']
+            dispatch(
+                ('index', item_type),
+                'Indexing {0}'.format(item_type),
+                lambda: index.add(store.items(item_type))
+            )
+    return INDEXES[item_type]
+
+
+def sync_items(item_type, message, on_done=None):
+    """ Sync an item type into the local store and its search index. """
+    dispatch(
+        ('sync', item_type),
+        message,
+        CONFIG['store'].sync,
+        CONFIG['client'],
+        item_type,
+        on_items=search_index(item_type).add,
+        on_done=on_done,
+        executor=CONFIG['sync_executor']
     )
 
 
 def test_auth(func):
-    """ Confirm that we are authenticated. """
+    """
+    Confirm that we are authenticated.
+
+    The token is trusted until the API rejects it. It is refreshed if
+    Axosoft issued a refresh token, otherwise or if that fails the user is
+    sent back through authentication.
+    """
     def wrapper(*args, **kwargs):
         """ wrapper function. """
-        if CONFIG['client'].is_authenticated():
-            return func(*args, **kwargs)
-        else:
-            sublime.message_dialog(
-                'You must authenticate with your Axosoft API first.'
-            )
-            return args[0].window.run_command('axosoft_auth')
+        def on_done(authenticated):
+            """ Run the command or ask for authentication. """
+            if authenticated:
+                func(*args, **kwargs)
+            else:
+                prompt_auth(args[0].window)
+
+        dispatch(
+            None,
+            'Checking authentication',
+            CONFIG['client'].is_authenticated,
+            on_done=on_done
+        )
     return wrapper
 
 
@@ -47,20 +533,46 @@ class AxosoftAuthCommand(sublime_plugin.WindowCommand):
         """ Init. """
         self.window = window
 
-    def finish_auth(self, text):
-        """ Convert the code to a token and complete authentication. """
-        token = CONFIG['client'].complete_authentication_by_code(
-            text,
-            CONFIG['redirectUri']
-        )
-        if CONFIG['client'].is_authenticated():
-            CONFIG['settings'].set('accessToken', token)
-            sublime.save_settings(CONFIG['file'])
+    def __on_token(self, token):
+        """ Store the token once authentication is complete. """
+        # The client already handed the token over to save_credentials
+        if token and CONFIG['client'].is_authenticated():
             sublime.message_dialog('Successfully Logged In')
+            # Whoever logged in, only their own writes may be sent
+            CONFIG.pop('writes', None)
+            dispatch(
+                None,
+                'Loading user',
+                CONFIG['metadata'].refresh,
+                ['me'],
+                True,
+                on_done=lambda refreshed: self.__on_user()
+            )
             self.window.run_command('axosoft_me')
         else:
             sublime.error_message('Authentication failed')
 
+    @staticmethod
+    def __on_user():
+        """ Send the writes the user left queued. """
+        if CONFIG['metadata'].me() is not None:
+            open_writes(CONFIG['metadata'].me())
+            flush_writes()
+
+    def finish_auth(self, text):
+        """ Convert the code to a token and complete authentication. """
+        dispatch(
+            'auth',
+            'Logging in',
+            CONFIG['client'].complete_authentication_by_code,
+            text,
+            CONFIG['redirectUri'],
+            on_done=self.__on_token,
+            on_error=lambda error: sublime.error_message(
+                'Authentication failed'
+            )
+        )
+
     def run(self):
         """ Start the code based authentication process. """
         plugin_loaded()
@@ -81,15 +593,68 @@ class AxosoftTerminateAuthCommand(sublime_plugin.WindowCommand):
 
     def run(self):
         """ Erase the token and get confirmation. """
-        CONFIG['settings'].erase('accessToken')
-        sublime.save_settings(CONFIG['file'])
+        writes = CONFIG.pop('writes', None)
+        if writes is not None and len(writes):
+            if not sublime.ok_cancel_dialog(
+                    "{0} changes haven't been sent to Axosoft yet, they "
+                    "are discarded when you log out.".format(len(writes)),
+                    'Log Out'):
+                CONFIG['writes'] = writes
+                return
+            writes.clear()
         CONFIG['client'].log_out()
+        save_credentials(CONFIG['client'].credentials())
+        CONFIG['metadata'].clear()
         if CONFIG['client'].is_authenticated():
             sublime.error_message('Something went wrong!')
         else:
             sublime.message_dialog('Successfully Logged Out')
 
 
+class AxosoftCancelCommand(sublime_plugin.WindowCommand):
+
+    """ Cancel the requests started from this window."""
+
+    def __init__(self, window):
+        """ Init. """
+        self.window = window
+
+    def run(self):
+        """ Cancel every running job keyed to this window. """
+        for key in list(RUNNING):
+            if isinstance(key, tuple) and key[-1] == self.window.id():
+                cancel(key)
+        sublime.status_message('Axosoft: Cancelled')
+
+
+class AxosoftShowStatsCommand(sublime_plugin.WindowCommand):
+
+    """ Show request stats in a new tab."""
+
+    def __init__(self, window):
+        """ Init. """
+        self.window = window
+
+    def run(self, reset=False):
+        """ Render the stats, then start counting again if reset. """
+        text = CONFIG['stats'].render()
+        coalescing = CONFIG['client'].coalescing_stats()
+        text += '\nGETs sharing an identical request: {0} of {1}\n'.format(
+            coalescing['deduplicated'],
+            coalescing['calls']
+        )
+        cache = CONFIG['client'].cache()
+        if cache is not None:
+            text += 'Response cache: {0} bytes\n'.format(cache.size())
+
+        new_view = self.window.new_file()
+        new_view.set_scratch(True)
+        new_view.set_name('Axosoft Stats')
+        new_view.run_command('axosoft_show_item', {'text': text})
+        if reset:
+            CONFIG['stats'].reset()
+
+
 class AxosoftMeCommand(sublime_plugin.WindowCommand):
 
     """ Get info about the current users."""
@@ -131,10 +696,9 @@ class AxosoftMeCommand(sublime_plugin.WindowCommand):
         else:
             pass
 
-    @test_auth
-    def run(self):
-        """ Show the current users. """
-        self.__me = CONFIG['client'].get('me')['data']
+    def __show_me(self, me):
+        """ Show the current user. """
+        self.__me = me
         items = [
             '{0} {1}'.format(
                 self.__me['first_name'],
@@ -146,6 +710,32 @@ class AxosoftMeCommand(sublime_plugin.WindowCommand):
             self.__on_select
         )
 
+    @test_auth
+    def run(self):
+        """ Show the current users. """
+        with_metadata('me', 'Loading user', self.__show_me)
+
+
+class AxosoftMyWorkCommand(sublime_plugin.WindowCommand):
+
+    """ Everything assigned to the current user, in one panel."""
+
+    def __init__(self, window):
+        """ Init. """
+        self.window = window
+
+    def __show(self, me):
+        """ List the items of every type assigned to me. """
+        self.window.run_command('axosoft_items', {
+            'item_types': ['defects', 'features', 'tasks', 'incidents'],
+            'user': me['id']
+        })
+
+    @test_auth
+    def run(self):
+        """ Run. """
+        with_metadata('me', 'Loading user', self.__show)
+
 
 class AxosoftItemsCommand(sublime_plugin.WindowCommand):
 
@@ -161,14 +751,46 @@ class AxosoftItemsCommand(sublime_plugin.WindowCommand):
             'View/Edit': self.__show_item,
             'Log Time': self.__start_log_time,
             'Delete': self.__delete_item,
-            'Open in Browser': self.__open_in_browser
+            'Open in Browser': self.__open_in_browser,
+            'Attachments': self.__open_attachment,
+            'Attach Current File': self.__attach_file
         }
         self.__time = {}
         self.__comment = {}
         self.__item_type = None
+        self.__loading = None
+        self.__merged = False
+        self.__panel = 0
+        self.__panel_open = False
+        self.__highlighted = 0
+
+    def __show_panel(self):
+        """
+        Show, or refresh, the items quick panel.
+
+        Showing a new panel dismisses the old one, so every panel gets a
+        number and selections from a replaced panel are ignored.
+        """
+        self.__panel += 1
+        panel = self.__panel
+        self.__panel_open = True
+        self.window.show_quick_panel(
+            self.__items,
+            lambda idx: self.__on_select_item(idx, panel),
+            0,
+            self.__highlighted,
+            self.__on_highlight
+        )
 
-    def __on_select_item(self, idx):
+    def __on_highlight(self, idx):
+        """ Remember the highlighted item across panel refreshes. """
+        self.__highlighted = idx
+
+    def __on_select_item(self, idx, panel):
         """ What to do when a item was selected. """
+        if panel != self.__panel:
+            return
+        self.__panel_open = False
         if idx != -1:
             self.__selected = idx
             sublime.set_timeout(
@@ -199,6 +821,20 @@ class AxosoftItemsCommand(sublime_plugin.WindowCommand):
         )
         webbrowser.open(url)
 
+    def __open_attachment(self, selected):
+        """ Pick an attachment of the selected item to open. """
+        self.window.run_command('axosoft_open_attachment', {
+            'item_type': self.__items_array[selected]['item_type'],
+            'item_id': self.__items_array[selected]['id']
+        })
+
+    def __attach_file(self, selected):
+        """ Attach the current file to the selected item. """
+        self.window.run_command('axosoft_attach_file', {
+            'item_type': self.__items_array[selected]['item_type'],
+            'item_id': self.__items_array[selected]['id']
+        })
+
     def __delete_item(self, selected):
         """ Delete the selected item. """
         confirmation = sublime.ok_cancel_dialog(
@@ -207,13 +843,26 @@ class AxosoftItemsCommand(sublime_plugin.WindowCommand):
             'Yes'
         )
         if confirmation:
-            CONFIG['client'].delete(
+            self.__delete(
                 self.__items_array[selected]['item_type'],
                 self.__items_array[selected]['id']
             )
         else:
             pass
 
+    @staticmethod
+    def __delete(item_type, item_id):
+        """ Queue the delete and drop the item locally straight away. """
+        def forget():
+            """ The delete is queued. """
+            forget_details(item_type, [item_id])
+            if 'store' in CONFIG:
+                CONFIG['store'].remove(item_type, [item_id])
+            if item_type in INDEXES:
+                INDEXES[item_type].remove([item_id])
+
+        queue_write('delete', item_type, item_id, on_queued=forget)
+
     # def __start_comment(self, selected):
     #     """ Start comment. """
     #     self.__comment['id'] = self.__items_array[selected]['id']
@@ -268,56 +917,299 @@ class AxosoftItemsCommand(sublime_plugin.WindowCommand):
         """ Finish Log time to selected item. """
         self.__time['description'] = text
         self.__time['date_time'] = datetime.datetime.now().isoformat()
-        self.__time['user_id'] = CONFIG['client'].get('me')['data']['id']
 
+        try:
+            float(self.__time['duration'])
+        except ValueError:
+            sublime.message_dialog(
+                "Unable to log time.\nWhen entering time enter only a number."
+            )
+            return
+
+        work_log = dict(self.__time)
+        with_metadata(
+            'me',
+            'Loading user',
+            lambda me: self.__log_time(work_log, me)
+        )
+
+    @staticmethod
+    def __log_time(work_log, me):
+        """ Queue the work log. """
         payload = {
-            'user': {'id': self.__time['user_id']},
+            'user': {'id': me['id']},
             'work_done': {
-                'duration': self.__time['duration'],
+                'duration': work_log['duration'],
                 'time_unit': {'id': 2}
             },
             'item': {
-                'id': self.__time['id'],
-                'item_type': self.__time['item_type']
+                'id': work_log['id'],
+                'item_type': work_log['item_type']
             },
-            'description': self.__time['description'],
-            'date_time': self.__time['date_time']
+            'description': work_log['description'],
+            'date_time': work_log['date_time']
         }
 
-        try:
-            CONFIG['client'].create(
-                'work_logs',
-                payload
-            )
-        except ValueError:
-            sublime.message_dialog(
-                "Unable to log time.\nWhen entering time enter only a number."
-            )
+        queue_write(
+            'create',
+            'work_logs',
+            payload,
+            on_queued=lambda: sublime.status_message('Axosoft: Time logged')
+        )
 
     def __show_item(self, selected):
-        """ List items. """
+        """
+        Load the full item, the list only holds a few of its fields.
+
+        An item opened before is reused while it hasn't been updated since.
+        """
+        item = self.__items_array[selected]
+        detail = CONFIG['details'].get((item['item_type'], item['id']))
+        updated = item.get('last_updated_date_time')
+        if (detail is not None and updated is not None
+                and detail.get('last_updated_date_time') == updated):
+            return self.__open_item(self.__items[selected], detail)
+
+        dispatch(
+            ('item', self.window.id()),
+            'Loading item',
+            CONFIG['client'].get,
+            item['item_type'],
+            item['id'],
+            on_done=lambda response: self.__open_item(
+                self.__items[selected],
+                response['data']
+            )
+        )
+
+    def __open_item(self, name, item):
+        """ Open an item for editing. """
+        text = json.dumps(
+            item,
+            sort_keys=True,
+            indent=4,
+            separators=(',', ': ')
+        )
+        CONFIG['details'].put((item['item_type'], item['id']), item, len(text))
         new_view = self.window.new_file()
         new_view.set_scratch(True)
-        new_view.set_name(self.__items[selected])
+        new_view.set_name(name)
         new_view.set_syntax_file('Packages/JavaScript/JSON.tmLanguage')
-        new_view.run_command(
-            'axosoft_show_item',
-            {
-                'text': json.dumps(
-                    self.__items_array[selected],
-                    sort_keys=True,
-                    indent=4,
-                    separators=(',', ': ')
+        new_view.run_command('axosoft_show_item', {'text': text})
+        # Keep the item as saved so saves only send what was changed, and
+        # the change count it was saved at to tell when there are changes
+        ITEM_VIEWS[new_view.id()] = {
+            'id': item['id'],
+            'item_type': item['item_type'],
+            'name': name,
+            'snapshot': json.loads(text),
+            'saved': new_view.change_count()
+        }
+
+    def __load(self, loading, item_type, payload):
+        """ Fetch the items page by page, runs in the background. """
+        count = 0
+        for data in CONFIG['client'].iter_pages(
+                item_type,
+                payload,
+                columns=True):
+            if loading is not self.__loading:
+                break
+            count += len(data)
+            sublime.set_timeout(
+                lambda data=data: self.__add_page(loading, item_type, data),
+                0
+            )
+        return count
+
+    def __append_items(self, item_type, items_data):
+        """ Add items to the list behind the quick panel. """
+        for item in items_data:
+            self.__items.append(
+                'axo{0}: #{1} - {2}'.format(
+                    item_type[:1],
+                    item['id'],
+                    item['name']
+                )
+            )
+            # Only what the list shows, the detail is loaded when opened
+            self.__items_array.append(summary(item_type, item))
+
+    def __add_page(self, loading, item_type, items_data):
+        """ Add a page of items and show them. """
+        if loading is not self.__loading or not items_data:
+            return
+
+        first_page = not self.__items
+        self.__append_items(item_type, items_data)
+        if self.__merged:
+            self.__sort_items()
+
+        if first_page:
+            sublime.set_timeout(self.__show_panel, 20)
+        elif self.__panel_open:
+            self.__show_panel()
+
+    def __sort_items(self):
+        """ Most recently updated first, keeping the highlighted item. """
+        highlighted = None
+        if 0 <= self.__highlighted < len(self.__items_array):
+            highlighted = self.__items_array[self.__highlighted]
+        order = sorted(
+            range(len(self.__items_array)),
+            key=lambda x: self.__items_array[x].get(
+                'last_updated_date_time'
+            ) or '',
+            reverse=True
+        )
+        self.__items = [self.__items[x] for x in order]
+        self.__items_array = [self.__items_array[x] for x in order]
+        if highlighted is not None:
+            self.__highlighted = self.__items_array.index(highlighted)
+
+    def __loaded(self, loading, count):
+        """ Called once every page has been fetched. """
+        if loading is self.__loading and count == 0:
+            sublime.message_dialog("No Items Found")
+
+    def __show_stored(self, loading, item_type, items_data, synced):
+        """ Show the items in the local store. """
+        if loading is not self.__loading:
+            return
+
+        was_empty = not self.__items
+        self.__items = []
+        self.__items_array = []
+        self.__append_items(item_type, items_data)
+
+        if not self.__items:
+            if synced:
+                sublime.message_dialog("No Items Found")
+        elif was_empty:
+            sublime.set_timeout(self.__show_panel, 20)
+        elif self.__panel_open:
+            self.__show_panel()
+
+    def __run_stored(self, item_type, user, search):
+        """ List the items from the local store, then apply the changes. """
+        store = CONFIG['store']
+        # The commands pass "None" for every user
+        if not isinstance(user, int) or not user:
+            user = None
+        index = search_index(item_type)
+
+        def stored_items():
+            """ Matching items, runs in the background. """
+            if search is None or not len(index):
+                return store.items(item_type, user, search, summaries=True)
+            # Ranked by the index
+            return [
+                x for x in index.search(search)
+                if user is None
+                or (x.get('assigned_to') or {}).get('id') == user
+            ]
+
+        def show(synced):
+            """ Read the store and show what it holds. """
+            dispatch(
+                ('items', self.window.id()),
+                'Loading items',
+                stored_items,
+                on_done=lambda items_data: self.__show_stored(
+                    loading,
+                    item_type,
+                    items_data,
+                    synced
                 )
-            }
+            )
+
+        self.__loading = loading = object()
+        show(False)
+
+        def on_synced(changed):
+            """ Show the items again if anything changed. """
+            if changed or not self.__items:
+                show(True)
+
+        sync_items(
+            item_type,
+            'Syncing {0}'.format(item_type),
+            on_done=on_synced
         )
 
+    def __run_merged(self, item_types, user):
+        """
+        List the items of several types in one panel.
+
+        Every type is fetched concurrently and merged into the panel as it
+        arrives, most recently updated first.
+        """
+        self.__loading = loading = object()
+        self.__merged = True
+        pending = {'types': len(item_types), 'count': 0}
+
+        def loaded(count):
+            """ Report once every type has been fetched. """
+            pending['types'] -= 1
+            pending['count'] += count
+            if not pending['types']:
+                self.__loaded(loading, pending['count'])
+
+        def add_stored(item_type, items_data):
+            """ Show the stored items of a type. """
+            self.__add_page(loading, item_type, items_data)
+            loaded(len(items_data))
+
+        store = CONFIG.get('store')
+        for item_type in item_types:
+            if store is not None and store.synced(item_type):
+                dispatch(
+                    ('items', item_type, self.window.id()),
+                    'Loading {0}'.format(item_type),
+                    store.items,
+                    item_type,
+                    user or None,
+                    summaries=True,
+                    on_done=lambda items_data, item_type=item_type: (
+                        add_stored(item_type, items_data)
+                    )
+                )
+                sync_items(item_type, 'Syncing {0}'.format(item_type))
+                continue
+
+            dispatch(
+                ('items', item_type, self.window.id()),
+                'Loading {0}'.format(item_type),
+                self.__load,
+                loading,
+                item_type,
+                {'assigned_to_id': user},
+                on_done=loaded
+            )
+            if store is not None:
+                sync_items(item_type, 'Downloading {0}'.format(item_type))
+
     @test_auth
-    def run(self, item_type, user=0, search=None):
-        """ Run. """
-        # Clear self.__itmes if anything was left in it
-        if self.__items:
-            self.__items = []
+    def run(self, item_type=None, user=0, search=None, item_types=None):
+        """ Run, item_types lists several types in one panel. """
+        # Clear out anything left from the last run
+        self.__items = []
+        self.__items_array = []
+        self.__highlighted = 0
+        self.__panel_open = False
+        self.__merged = False
+
+        if item_types is not None:
+            return self.__run_merged(item_types, user)
+
+        # Use the local copy unless a search can't be answered from it
+        store = CONFIG.get('store')
+        if store is not None and store.synced(item_type) and (
+                search is None
+                or not search_index(item_type).stale(
+                    CONFIG['settings'].get('axosoft_index_max_age', 600)
+                )):
+            return self.__run_stored(item_type, user, search)
 
         # Create our payload
         payload = {'assigned_to_id': user}
@@ -326,60 +1218,525 @@ class AxosoftItemsCommand(sublime_plugin.WindowCommand):
         if search is not None:
             payload['search_string'] = search
 
-        # Get the items from the API
-        items_data = CONFIG['client'].get(
+        # Get the items from the API, the panel opens with the first page
+        self.__loading = loading = object()
+        dispatch(
+            ('items', self.window.id()),
+            'Loading items',
+            self.__load,
+            loading,
             item_type,
-            None,
-            payload
-        )['data']
-
-        # Did we get anything back?
-        if items_data:
-            self.__items_array = []
-            for item in items_data:
-                self.__items.append(
-                    'axo{0}: #{1} - {2}'.format(
-                        item_type[:1],
-                        item['id'],
-                        item['name']
-                    )
-                )
-                self.__items_array.append(item)
+            payload,
+            on_done=lambda count: self.__loaded(loading, count)
+        )
 
-            sublime.set_timeout(
-                lambda: self.window.show_quick_panel(
-                    self.__items,
-                    self.__on_select_item
-                ),
-                20
-            )
-        else:
-            sublime.message_dialog("No Items Found")
+        # Mirror the item type locally for next time
+        if store is not None:
+            sync_items(item_type, 'Downloading {0}'.format(item_type))
 
 
 class AxosoftSearchItemsCommand(sublime_plugin.WindowCommand):
 
-    """ Search for a Item."""
+    """
+    Search for items as you type.
+
+    Matches are listed in a results tab while typing, Enter opens them in
+    the items panel. Queries the local index or store can answer never
+    reach the API, both are queried in the background. Otherwise a
+    query is sent once typing pauses, replacing the one in flight, and a
+    complete result is narrowed locally while the query grows.
+    """
 
     def __init__(self, window):
         """ Init. """
         self.__item_type = None
         self.window = window
+        self.__query = None
+        self.__results = OrderedDict()
+        self.__view = None
 
     @test_auth
     def run(self, item_type):
         """ Run. """
         self.__item_type = item_type
-        self.window.show_input_panel('Search', '', self.__search, None, None)
+        self.__query = None
+        self.__results = OrderedDict()
+        self.__view = self.window.new_file()
+        self.__view.set_scratch(True)
+        self.__view.set_name('Axosoft Search')
+        self.window.show_input_panel(
+            'Search',
+            '',
+            self.__search,
+            self.__on_change,
+            self.__on_cancel
+        )
+
+    @staticmethod
+    def __matches(item, text):
+        """ The local equivalent of search_string, by id or name. """
+        return ('{0}'.format(item['id']) == text
+                or text.lower() in (item.get('name') or '').lower())
+
+    def __narrowed(self, text):
+        """
+        Results of the longest earlier query text starts with.
+
+        Returns the matching items and whether that query was complete,
+        None when there is no such query.
+        """
+        for query in sorted(self.__results, key=len, reverse=True):
+            if text.lower().startswith(query.lower()):
+                items, complete = self.__results[query]
+                return [x for x in items if self.__matches(x, text)], complete
+        return None
+
+    def __on_change(self, text):
+        """ Show what is known now, query the API once typing pauses. """
+        text = text.strip()
+        self.__query = text
+        if not text:
+            cancel(('search', self.window.id()))
+            return self.__render(text, [], False)
+
+        index = search_index(self.__item_type)
+        if not index.stale(
+                CONFIG['settings'].get('axosoft_index_max_age', 600)):
+            # Off the UI thread, the index may be locked by a sync
+            return dispatch(
+                ('search', self.window.id()),
+                'Searching',
+                index.search,
+                text,
+                SEARCH_LIMIT,
+                on_done=lambda items: self.__on_index_results(text, items)
+            )
+
+        narrowed = self.__narrowed(text)
+        if narrowed is not None and narrowed[1]:
+            cancel(('search', self.window.id()))
+            return self.__render(text, narrowed[0], False)
+
+        narrowed = self.__narrowed(text)
+        self.__render(text, narrowed[0] if narrowed else [], True)
+        store = CONFIG.get('store')
+        if store is not None and store.synced(self.__item_type):
+            # Local, no need to wait for typing to pause
+            return self.__send(text, self.__query_store)
+        sublime.set_timeout(
+            lambda: self.__send(text, self.__fetch),
+            CONFIG['settings'].get('axosoft_search_delay', 250)
+        )
+
+    def __send(self, text, query):
+        """ Run a query in the background unless the user kept typing. """
+        if text != self.__query:
+            return
+        # Dispatching with the same key cancels the superseded query
+        dispatch(
+            ('search', self.window.id()),
+            'Searching',
+            query,
+            self.__item_type,
+            text,
+            on_done=lambda result: self.__on_results(text, result)
+        )
+
+    def __on_index_results(self, text, items):
+        """
+        Show the results if still current.
+
+        They are not kept for narrowing, the index also matches words of
+        the description that narrowing by name would drop.
+        """
+        if text == self.__query:
+            self.__render(text, items, False)
+
+    @staticmethod
+    def __query_store(item_type, text):
+        """ The first stored matches and whether they are all of them. """
+        items = CONFIG['store'].items(
+            item_type,
+            None,
+            text,
+            limit=SEARCH_LIMIT + 1,
+            summaries=True
+        )
+        return items[:SEARCH_LIMIT], len(items) <= SEARCH_LIMIT
+
+    @staticmethod
+    def __fetch(item_type, text):
+        """ The first matches and whether they are all of them. """
+        response = CONFIG['client'].get(
+            item_type,
+            payload={
+                'search_string': text,
+                'page': 1,
+                'page_size': SEARCH_LIMIT
+            },
+            columns=True
+        )
+        data = response['data']
+        total_pages = response.get('metadata', {}).get('total_pages')
+        if total_pages is not None:
+            return data, total_pages <= 1
+        return data, len(data) < SEARCH_LIMIT
+
+    def __on_results(self, text, result):
+        """ Keep the results for narrowing, show them if still current. """
+        self.__results[text] = result
+        while len(self.__results) > SEARCH_HISTORY:
+            self.__results.popitem(last=False)
+        if text == self.__query:
+            self.__render(text, result[0], False)
+
+    def __render(self, text, items, searching):
+        """ Replace the contents of the results tab. """
+        if self.__view is None or not self.__view.is_valid():
+            return
+        if not text:
+            lines = ['Type to search {0}'.format(self.__item_type)]
+        elif searching:
+            lines = ['Searching {0} for "{1}"...'.format(
+                self.__item_type,
+                text
+            )]
+        else:
+            lines = ['{0}{1} {2} matching "{3}"'.format(
+                len(items),
+                '+' if len(items) >= SEARCH_LIMIT else '',
+                self.__item_type,
+                text
+            )]
+        lines.append('')
+        lines += [
+            '#{0} - {1}'.format(x['id'], x.get('name', ''))
+            for x in items[:SEARCH_LIMIT]
+        ]
+        self.__view.run_command(
+            'axosoft_replace_text',
+            {'text': '\n'.join(lines) + '\n'}
+        )
+
+    def __close(self):
+        """ Stop searching and close the results tab. """
+        cancel(('search', self.window.id()))
+        self.__query = None
+        if self.__view is not None and self.__view.is_valid():
+            self.window.focus_view(self.__view)
+            self.window.run_command('close_file')
+        self.__view = None
+
+    def __on_cancel(self):
+        """ The search was abandoned. """
+        self.__close()
 
     def __search(self, text):
         """ Search. """
+        self.__close()
         self.window.run_command(
             'axosoft_items',
             {'item_type': self.__item_type, 'user': None, 'search': text}
         )
 
 
+class AxosoftBulkItemsCommand(sublime_plugin.WindowCommand):
+
+    """ Apply one action to many items at once."""
+
+    def __init__(self, window):
+        """ Init. """
+        self.window = window
+        self.__item_type = None
+        self.__items_array = []
+        self.__chosen = set()
+        self.__actions = {
+            'Assign to Me': self.__assign_to_me,
+            'Move to Current Project': self.__move_to_project,
+            'Delete': self.__delete
+        }
+
+    def __show_items(self, highlighted=0):
+        """ Show the items with a mark next to the chosen ones. """
+        items = ['Done ({0} chosen)'.format(len(self.__chosen))]
+        for item in self.__items_array:
+            items.append(
+                '[{0}] axo{1}: #{2} - {3}'.format(
+                    'x' if item['id'] in self.__chosen else ' ',
+                    self.__item_type[:1],
+                    item['id'],
+                    item['name']
+                )
+            )
+        self.window.show_quick_panel(
+            items,
+            self.__on_select_item,
+            0,
+            highlighted
+        )
+
+    def __on_select_item(self, idx):
+        """ Toggle an item or move on to the actions. """
+        if idx == -1:
+            pass
+        elif idx == 0:
+            if self.__chosen:
+                sublime.set_timeout(
+                    lambda: self.window.show_quick_panel(
+                        sorted(self.__actions),
+                        self.__on_select_action
+                    ),
+                    20
+                )
+        else:
+            item_id = self.__items_array[idx - 1]['id']
+            self.__chosen.symmetric_difference_update([item_id])
+            sublime.set_timeout(lambda: self.__show_items(idx), 20)
+
+    def __on_select_action(self, idx):
+        """ Run the chosen action over the chosen items. """
+        if idx != -1:
+            self.__actions[sorted(self.__actions)[idx]]()
+
+    def __update(self, message, item):
+        """ Apply the same change to every chosen item. """
+        item_type = self.__item_type
+        dispatch(
+            None,
+            message,
+            CONFIG['client'].bulk_update,
+            item_type,
+            [(item_id, {'item': item}) for item_id in sorted(self.__chosen)],
+            on_done=lambda results: self.__report(item_type, results)
+        )
+
+    def __assign_to_me(self):
+        """ Assign the chosen items to the current user. """
+        def on_me(me):
+            """ Assign once we know who we are. """
+            self.__update(
+                'Assigning items',
+                {'assigned_to': {'id': me['id'], 'type': 'user'}}
+            )
+
+        with_metadata('me', 'Loading user', on_me)
+
+    def __move_to_project(self):
+        """ Move the chosen items to the current project. """
+        if CONFIG['settings'].has('axosoft_project'):
+            self.__update(
+                'Moving items',
+                {'project': {'id': CONFIG['settings'].get('axosoft_project')}}
+            )
+        else:
+            sublime.message_dialog('You must first set the current project')
+
+    def __delete(self):
+        """ Delete the chosen items. """
+        confirmation = sublime.ok_cancel_dialog(
+            'You are about to delete {0} items\n Are you sure?'
+            .format(len(self.__chosen)),
+            'Yes'
+        )
+        if confirmation:
+            item_type = self.__item_type
+            dispatch(
+                None,
+                'Deleting items',
+                CONFIG['client'].bulk_delete,
+                item_type,
+                sorted(self.__chosen),
+                on_done=lambda results: self.__report(
+                    item_type,
+                    results,
+                    deleted=True
+                )
+            )
+
+    @staticmethod
+    def __report(item_type, results, deleted=False):
+        """ Tell the user how the batch went. """
+        failed = [x for x in results if not x.success]
+        forget_details(item_type, [x.resource_id for x in results])
+        if deleted:
+            done = [x.resource_id for x in results if x.success]
+            if 'store' in CONFIG:
+                CONFIG['store'].remove(item_type, done)
+            if item_type in INDEXES:
+                INDEXES[item_type].remove(done)
+        elif 'store' in CONFIG:
+            sync_items(item_type, 'Syncing {0}'.format(item_type))
+        if failed:
+            sublime.error_message(
+                '{0} of {1} items failed:\n{2}'.format(
+                    len(failed),
+                    len(results),
+                    '\n'.join(
+                        '#{0}: {1}'.format(x.resource_id, x.error)
+                        for x in failed
+                    )
+                )
+            )
+        else:
+            sublime.status_message(
+                'Axosoft: {0} items done'.format(len(results))
+            )
+
+    def __on_items(self, items_data):
+        """ Show the items that can be chosen. """
+        self.__items_array = items_data
+        if items_data:
+            self.__show_items()
+        else:
+            sublime.message_dialog("No Items Found")
+
+    @test_auth
+    def run(self, item_type):
+        """ Run. """
+        self.__item_type = item_type
+        self.__chosen = set()
+        store = CONFIG.get('store')
+        if store is not None and store.synced(item_type):
+            dispatch(
+                ('bulk', self.window.id()),
+                'Loading items',
+                store.items,
+                item_type,
+                summaries=True,
+                on_done=self.__on_items
+            )
+        else:
+            dispatch(
+                ('bulk', self.window.id()),
+                'Loading items',
+                lambda: list(
+                    CONFIG['client'].iter_all(item_type, columns=True)
+                ),
+                on_done=self.__on_items
+            )
+
+
+class AxosoftAttachFileCommand(sublime_plugin.WindowCommand):
+
+    """ Attach the file in the active view to an item."""
+
+    def __init__(self, window):
+        """ Init. """
+        self.window = window
+
+    def __upload(self, path, item_type, item_id):
+        """ Upload the file in the background. """
+        name = os.path.basename(path)
+        holder, on_progress = transfer_progress('Uploading {0}'.format(name))
+        holder['job'] = dispatch(
+            ('attach', self.window.id()),
+            'Uploading {0}'.format(name),
+            CONFIG['client'].upload_attachment,
+            item_type,
+            item_id,
+            path,
+            on_progress=on_progress,
+            on_done=lambda response: sublime.status_message(
+                'Axosoft: Attached {0} to #{1}'.format(name, item_id)
+            )
+        )
+
+    @test_auth
+    def run(self, item_type=None, item_id=None):
+        """ Run. """
+        view = self.window.active_view()
+        path = view.file_name() if view is not None else None
+        if path is None or not os.path.isfile(path):
+            sublime.error_message('Axosoft: Save the file to attach it.')
+            return
+        if view.is_dirty():
+            sublime.status_message(
+                'Axosoft: Attaching the saved version of the file'
+            )
+        pick_item(
+            self.window,
+            'Attach {0} to item #'.format(os.path.basename(path)),
+            lambda item_type, item_id: self.__upload(
+                path,
+                item_type,
+                item_id
+            ),
+            item_type,
+            item_id
+        )
+
+
+class AxosoftOpenAttachmentCommand(sublime_plugin.WindowCommand):
+
+    """ Download an attachment of an item and open it."""
+
+    def __init__(self, window):
+        """ Init. """
+        self.window = window
+        self.__attachments = []
+
+    def __list(self, item_type, item_id):
+        """ Fetch the attachments of the item. """
+        dispatch(
+            ('attachments', self.window.id()),
+            'Loading attachments',
+            CONFIG['client'].get,
+            item_type,
+            item_id,
+            element='attachments',
+            on_done=self.__show_attachments
+        )
+
+    def __show_attachments(self, response):
+        """ Let the user pick an attachment. """
+        self.__attachments = response['data']
+        if not self.__attachments:
+            sublime.status_message('Axosoft: The item has no attachments')
+            return
+        self.window.show_quick_panel(
+            [
+                [
+                    x.get('name') or '#{0}'.format(x['id']),
+                    '{0} KB'.format((x.get('size') or 0) // 1024)
+                ]
+                for x in self.__attachments
+            ],
+            self.__on_select
+        )
+
+    def __on_select(self, idx):
+        """ Download the selected attachment. """
+        if idx == -1:
+            return
+        attachment = self.__attachments[idx]
+        name = os.path.basename(
+            attachment.get('name') or '{0}'.format(attachment['id'])
+        )
+        holder, on_progress = transfer_progress(
+            'Downloading {0}'.format(name)
+        )
+        holder['job'] = dispatch(
+            ('download', attachment['id']),
+            'Downloading {0}'.format(name),
+            CONFIG['client'].download_attachment,
+            attachment['id'],
+            cache_file('attachment-{0}-{1}'.format(attachment['id'], name)),
+            on_progress=on_progress,
+            on_done=self.window.open_file
+        )
+
+    @test_auth
+    def run(self, item_type=None, item_id=None):
+        """ Run. """
+        pick_item(
+            self.window,
+            'Attachments of item #',
+            self.__list,
+            item_type,
+            item_id
+        )
+
+
 class AxosoftCreateItemsCommand(sublime_plugin.WindowCommand):
 
     """ Create a new Items."""
@@ -403,20 +1760,22 @@ class AxosoftCreateItemsCommand(sublime_plugin.WindowCommand):
             'time_unit': {'id': 2}
         }
 
-        try:
-            data = CONFIG['client'].create(
-                self.__item_type,
-                payload=self.payload
-            )['data']
-        except ValueError as response:
-            # Ugly hack because axosoft doesn't return the correct HTTP
-            # response code
-            data = response.args[0]['data']
-
-        self.window.run_command(
-            'axosoft_items',
-            {'item_type': self.__item_type, 'user': None, 'search': data['id']}
+        item_type = self.__item_type
+        queue_write(
+            'create',
+            item_type,
+            self.payload,
+            on_done=lambda response: self.window.run_command(
+                'axosoft_items',
+                {
+                    'item_type': item_type,
+                    'user': None,
+                    'search': response['data']['id']
+                }
+            ),
+            on_queued=lambda: sublime.status_message('Axosoft: Item created')
         )
+        self.payload = {}
 
     def __description(self, text):
         """ Prompt for description. """
@@ -485,11 +1844,9 @@ class AxosoftProjectsCommand(sublime_plugin.WindowCommand):
         else:
             pass
 
-    @test_auth
-    def run(self):
-        """ Run. """
-        self.__projects = CONFIG['client'].get('projects')['data']
-        print(self.__projects)
+    def __show_projects(self):
+        """ Show every project, sub projects included. """
+        self.__projects = CONFIG['metadata'].projects()
 
         items = [x['name']for x in self.__projects]
         self.window.show_quick_panel(
@@ -497,6 +1854,15 @@ class AxosoftProjectsCommand(sublime_plugin.WindowCommand):
             self.__on_select
         )
 
+    @test_auth
+    def run(self):
+        """ Run. """
+        with_metadata(
+            'projects',
+            'Loading projects',
+            lambda projects: self.__show_projects()
+        )
+
 
 class AxosoftShowItemCommand(sublime_plugin.TextCommand):
 
@@ -506,50 +1872,124 @@ class AxosoftShowItemCommand(sublime_plugin.TextCommand):
         """ Init. """
         self.view = view
 
-    @test_auth
     def run(self, edit, text):
         """ Run. """
         self.view.insert(edit, self.view.size(), text)
 
 
-class EventListeners(sublime_plugin.EventListener):
+class AxosoftReplaceTextCommand(sublime_plugin.TextCommand):
 
-    """ Event Listeners."""
+    """ Replace the whole text of a view."""
 
-    def __init__(self):
+    def __init__(self, view):
         """ Init. """
-        self.modified_views = {}
+        self.view = view
+
+    def run(self, edit, text):
+        """ Run. """
+        self.view.replace(edit, sublime.Region(0, self.view.size()), text)
+
+
+def parse_changes(text, snapshot):
+    """ Validate an edited item and diff it, runs in the background. """
+    try:
+        content = json.loads(text)
+    except ValueError as error:
+        raise ValueError('The item is not valid JSON, {0}'.format(error))
+    if not isinstance(content, dict):
+        raise ValueError('The item is not a JSON object')
+    return content, diff(snapshot, content)
+
+
+def save_item(opened, content, changes, change_count):
+    """ Queue the changes of an item view and mark it saved. """
+    opened['snapshot'] = content
+    opened['saved'] = change_count
+    if changes:
+        forget_details(opened['item_type'], [opened['id']])
+        queue_write(
+            'update',
+            opened['item_type'],
+            opened['id'],
+            {'item': changes}
+        )
+
+
+class EventListeners(sublime_plugin.EventListener):
+
+    """
+    Event Listeners.
+
+    Only views opened by View/Edit are tracked, in ITEM_VIEWS by view id.
+    A view has unsaved changes when its change count moved past the one it
+    was last saved at.
+    """
 
     def on_modified(self, view):
-        """ On Modified. """
-        if view.name().startswith("axo"):
-            if view.name() not in self.modified_views:
-                self.modified_views[view.name()] = 1
-            else:
-                self.modified_views[view.name()] += 1
-
-    def on_pre_close(self, view):
-        """ Save the item on close. """
-        if (re.match(r'^axo[dfit]:\s#\d+', view.name())
-                and view.name() in self.modified_views
-                and self.modified_views[view.name()] > 2):
-            confirmation = sublime.ok_cancel_dialog(
-                "Save the changes to {0}?".format(view.name()),
-                "Save"
-            )
-            if confirmation:
-                content_region = sublime.Region(0, view.size())
-                content_string = view.substr(content_region)
-                content_json = json.loads(content_string)
-                item_id = content_json['id']
-                item_type = content_json['item_type']
-
-                CONFIG['client'].update(
-                    item_type,
-                    item_id,
-                    payload={'item': content_json}
-                )
+        """ Schedule an autosave once typing stops. """
+        if view.id() not in ITEM_VIEWS:
+            return
+        settings = CONFIG['settings']
+        if settings.get('axosoft_autosave', False):
+            view_id = view.id()
+            change_count = view.change_count()
+            sublime.set_timeout(
+                lambda: self.__autosave(view, view_id, change_count),
+                settings.get('axosoft_autosave_delay', 2000)
+            )
 
-            self.modified_views[view.name()] = 0
-        else:
-            pass
+    @staticmethod
+    def __autosave(view, view_id, change_count):
+        """ Save the view if it wasn't changed or closed since. """
+        opened = ITEM_VIEWS.get(view_id)
+        if (opened is None
+                or view.change_count() != change_count
+                or opened['saved'] == change_count):
+            return
+        dispatch(
+            ('autosave', view_id),
+            'Checking item',
+            parse_changes,
+            view.substr(sublime.Region(0, view.size())),
+            opened['snapshot'],
+            on_done=lambda result: save_item(
+                opened,
+                result[0],
+                result[1],
+                change_count
+            ),
+            # Half typed JSON is expected, try again after the next change
+            on_error=lambda error: sublime.status_message(
+                'Axosoft: Not saved, {0}'.format(error)
+            )
+        )
+
+    @staticmethod
+    def on_pre_close(view):
+        """ Offer to save the item on close. """
+        opened = ITEM_VIEWS.pop(view.id(), None)
+        if opened is None:
+            return
+        cancel(('autosave', view.id()))
+        if view.change_count() == opened['saved']:
+            return
+
+        def confirm(result):
+            """ Ask before saving. """
+            content, changes = result
+            if changes and sublime.ok_cancel_dialog(
+                    "Save the changes to {0}?".format(opened['name']),
+                    "Save"):
+                save_item(opened, content, changes, None)
+
+        dispatch(
+            None,
+            'Checking item',
+            parse_changes,
+            view.substr(sublime.Region(0, view.size())),
+            opened['snapshot'],
+            on_done=confirm,
+            on_error=lambda error: sublime.error_message(
+                'Unable to save {0}.\n{1}'.format(opened['name'], error)
+            )
+        )
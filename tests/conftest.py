@@ -0,0 +1,77 @@
+"""
+Fixtures.
+
+Every test talks to its own stand-in server from benchmarks.standin.
+"""
+import asyncio
+
+import pytest
+
+from axosoft_api import Axosoft
+from axosoft_api.retry import RetryPolicy
+from benchmarks.standin import Options, StandInServer
+# pylint: disable=F0401
+try:
+    from axosoft_api.aio import AsyncAxosoft, aiohttp
+except ImportError:
+    AsyncAxosoft = aiohttp = None
+
+ITEMS = 20
+
+
+class Blocking(object):
+
+    """ An AsyncAxosoft with its coroutines run to completion. """
+
+    def __init__(self, client):
+        """ Init. """
+        self.__client = client
+        self.__loop = asyncio.new_event_loop()
+
+    def __getattr__(self, name):
+        """ Wrap coroutine methods so they block. """
+        attribute = getattr(self.__client, name)
+        if not asyncio.iscoroutinefunction(attribute):
+            return attribute
+        return lambda *args, **kwargs: self.__loop.run_until_complete(
+            attribute(*args, **kwargs)
+        )
+
+    def close(self):
+        """ Close the client and its loop. """
+        self.__loop.run_until_complete(self.__client.close())
+        self.__loop.close()
+
+
+@pytest.fixture
+def server():
+    """ A stand-in with a few items of each type. """
+    server = StandInServer(options=Options(items=ITEMS)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_client(server):
+    """ Build blocking clients for the stand-in, closed after the test. """
+    clients = []
+
+    def make(kind='sync', token=True, **kwargs):
+        """ A client of kind 'sync' or 'async', with a token by default. """
+        if token is True:
+            token = server.issue_token()['access_token']
+        kwargs.setdefault('retry', RetryPolicy(backoff=0))
+        if kind == 'sync':
+            client = Axosoft('test', 'test', server.domain, token,
+                             scheme='http', **kwargs)
+        else:
+            if aiohttp is None:
+                pytest.skip('aiohttp is not installed')
+            client = Blocking(AsyncAxosoft('test', 'test', server.domain,
+                                           token, scheme='http', **kwargs))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
@@ -0,0 +1,107 @@
+"""
+Attachments.
+
+Uploads and resumable downloads against the stand-in.
+"""
+import os
+
+import pytest
+import requests
+
+from axosoft_api.retry import RetryPolicy
+
+SIZE = 300 * 1024
+
+
+@pytest.fixture
+def uploaded(make_client, tmpdir):
+    """ The id and content of a file attached to defect 1. """
+    content = os.urandom(SIZE)
+    path = tmpdir.join('upload.bin')
+    path.write_binary(content)
+    data = make_client().upload_attachment('defects', 1, str(path))
+    return data['data']['id'], content
+
+
+def test_upload_reports_progress(make_client, server, tmpdir):
+    content = os.urandom(SIZE)
+    path = tmpdir.join('upload.bin')
+    path.write_binary(content)
+    progress = []
+
+    data = make_client().upload_attachment(
+        'defects',
+        1,
+        str(path),
+        on_progress=lambda done, total: progress.append((done, total))
+    )['data']
+    assert data['name'] == 'upload.bin'
+    assert server.data.attachments[data['id']]['content'] == content
+    assert len(progress) > 1
+    assert progress[-1] == (SIZE, SIZE)
+    assert [x[0] for x in progress] == sorted(x[0] for x in progress)
+
+
+def test_download(make_client, uploaded, tmpdir):
+    attachment_id, content = uploaded
+    path = str(tmpdir.join('download.bin'))
+    progress = []
+
+    make_client().download_attachment(
+        attachment_id,
+        path,
+        on_progress=lambda done, total: progress.append((done, total))
+    )
+    with open(path, 'rb') as download:
+        assert download.read() == content
+    assert progress[-1] == (SIZE, SIZE)
+    assert not os.path.exists(path + '.part')
+
+
+def test_lost_connection_is_resumed(make_client, server, uploaded, tmpdir):
+    attachment_id, content = uploaded
+    path = str(tmpdir.join('download.bin'))
+    server.cut(100 * 1024)
+
+    make_client().download_attachment(attachment_id, path)
+    with open(path, 'rb') as download:
+        assert download.read() == content
+    data_path = '/attachments/{0}/data'.format(attachment_id)
+    assert [x for x in server.requests if x[1].endswith(data_path)] \
+        == [('GET', server.requests[-1][1])] * 2
+
+
+def test_part_file_is_resumed(make_client, server, uploaded, tmpdir):
+    attachment_id, content = uploaded
+    path = str(tmpdir.join('download.bin'))
+    server.cut(100 * 1024)
+    client = make_client(retry=RetryPolicy(max_retries=0))
+
+    with pytest.raises(requests.RequestException):
+        client.download_attachment(attachment_id, path)
+    assert not os.path.exists(path)
+    # Whole chunks that arrived before the connection was lost
+    kept = os.path.getsize(path + '.part')
+    assert 0 < kept <= 100 * 1024
+
+    progress = []
+    client.download_attachment(
+        attachment_id,
+        path,
+        on_progress=lambda done, total: progress.append((done, total))
+    )
+    with open(path, 'rb') as download:
+        assert download.read() == content
+    # Counted from the part already on disk
+    assert progress[0][0] > kept
+    assert progress[0][1] == SIZE
+
+
+def test_part_file_of_another_download(make_client, uploaded, tmpdir):
+    attachment_id, content = uploaded
+    path = tmpdir.join('download.bin')
+    # Longer than the attachment, the stand-in answers the Range with a 416
+    tmpdir.join('download.bin.part').write_binary(b'x' * (SIZE + 10))
+
+    make_client().download_attachment(attachment_id, str(path))
+    assert path.read_binary() == content
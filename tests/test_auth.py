@@ -0,0 +1,27 @@
+"""
+Auth.
+
+Tokens of the blocking client against the stand-in's OAuth endpoint.
+"""
+import pytest
+
+from axosoft_api import AuthenticationError
+
+
+def test_rejected_token_is_handed_to_on_token(make_client):
+    stored = []
+    client = make_client(token='revoked', on_token=stored.append)
+    with pytest.raises(AuthenticationError):
+        client.get('me')
+    assert stored[-1]['access_token'] is None
+
+
+def test_code_is_exchanged_despite_a_stored_token(make_client, server):
+    client = make_client(token='revoked')
+    # Trusted, it was just loaded and hasn't been rejected yet
+    assert client.is_authenticated()
+
+    token = client.complete_authentication_by_code('code', 'http://local')
+    assert token != 'revoked'
+    assert token in server.data.tokens
+    assert client.get('me')['data']['id'] == 1
@@ -0,0 +1,62 @@
+"""
+Bulk.
+
+Batches of calls on a shared executor.
+"""
+import threading
+import time
+
+from axosoft_api.bulk import run_bulk
+from axosoft_api.executor import Executor
+
+
+def test_results_keep_the_order_of_calls():
+    executor = Executor(4)
+
+    def call(value):
+        """ Fail on odd values. """
+        time.sleep(0.001 * (10 - value))
+        if value % 2:
+            raise ValueError(value)
+        return value
+
+    results = run_bulk(executor, call, [(x, (x,)) for x in range(10)])
+    assert [x.resource_id for x in results] == list(range(10))
+    assert [x.success for x in results] == [not x % 2 for x in range(10)]
+    assert results[4].data == 4
+    executor.shutdown()
+
+
+def test_batches_leave_room_for_other_work():
+    executor = Executor(4)
+    lock = threading.Lock()
+    state = {'started': 0, 'running': 0, 'most': 0}
+    other = {}
+
+    def other_work():
+        """ Note how far the batch got before this ran. """
+        return state['started']
+
+    def call(index):
+        """ Track how many calls run at once. """
+        with lock:
+            state['started'] += 1
+            state['running'] += 1
+            state['most'] = max(state['most'], state['running'])
+        if index == 0:
+            other['job'] = executor.submit(other_work)
+        time.sleep(0.005)
+        with lock:
+            state['running'] -= 1
+        return index
+
+    results = run_bulk(executor, call, [(x, (x,)) for x in range(40)], 2)
+    assert [x.data for x in results] == list(range(40))
+    assert state['most'] == 2
+    # Submitted during the first call, it didn't wait for the whole batch
+    assert other['job'].result(1) <= 3
+    executor.shutdown()
+
+
+def test_empty_batch():
+    assert run_bulk(Executor(1), len, []) == []
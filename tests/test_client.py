@@ -0,0 +1,50 @@
+"""
+Client.
+
+Lifetime of the blocking client's connections and worker threads.
+"""
+import threading
+import time
+
+from axosoft_api.cache import ResponseCache
+
+
+def wait_for_threads(count, timeout=1.0):
+    """ Wait until no more than count threads are alive. """
+    deadline = time.time() + timeout
+    while threading.active_count() > count and time.time() < deadline:
+        time.sleep(0.01)
+    return threading.active_count()
+
+
+def test_close_stops_the_workers(make_client):
+    client = make_client()
+    threads = threading.active_count()
+    assert all(result.success for result in client.warm_up())
+    assert threading.active_count() > threads
+
+    client.close()
+    assert wait_for_threads(threads) == threads
+
+
+def test_client_works_after_log_out(make_client):
+    client = make_client()
+    client.warm_up()
+    client.log_out()
+    assert client.authenticate_by_password('user', 'password')
+    results = client.warm_up(['defects', 'features'])
+    assert [result.resource_id for result in results if result.success] \
+        == ['defects', 'features']
+
+
+def test_log_out_clears_the_cache(make_client, server):
+    client = make_client(cache=ResponseCache(1024 * 1024))
+    client.get('me')
+    client.get('me')
+    assert len(server.requests) == 1
+
+    client.log_out()
+    assert client.authenticate_by_password('user', 'password')
+    client.get('me')
+    assert server.requests[-1] == server.requests[0]
+    assert len(server.requests) == 3
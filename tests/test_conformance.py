@@ -0,0 +1,118 @@
+"""
+Conformance.
+
+Axosoft and AsyncAxosoft must behave the same against the stand-in.
+"""
+import pytest
+
+from axosoft_api import AuthenticationError, ServerError
+from axosoft_api.config import RESOURCES
+
+KINDS = ['sync', 'async']
+
+
+@pytest.fixture(params=KINDS)
+def client(request, make_client):
+    """ One client of each kind. """
+    return make_client(request.param)
+
+
+def test_get_item(client):
+    assert client.get('defects', 1)['data']['id'] == 1
+
+
+def test_get_page(client):
+    data = client.get('defects', payload={'page': 2, 'page_size': 5})
+    assert len(data['data']) == 5
+    assert data['metadata']['page'] == 2
+
+
+def test_get_leaves_out_none_params(client):
+    data = client.get(
+        'defects',
+        payload={'assigned_to_id': None, 'page': 1, 'page_size': 5}
+    )
+    assert len(data['data']) == 5
+
+
+def test_get_columns(client):
+    item = client.get('defects', 1, columns=True)['data']
+    assert set(item) <= set(RESOURCES['defects']['columns'])
+    assert 'description' not in item
+
+
+def test_get_missing_raises_value_error(client):
+    with pytest.raises(ValueError) as error:
+        client.get('defects', 999999)
+    assert not isinstance(error.value, AuthenticationError)
+
+
+def test_unknown_address_raises_lookup_error(client):
+    with pytest.raises(LookupError):
+        client.get('nothing')
+
+
+def test_create_update_delete(client, server):
+    created = client.create('defects', {'item': {'name': 'New'}})['data']
+    assert server.data.resources['defects'][created['id']]['name'] == 'New'
+
+    updated = client.update(
+        'defects',
+        created['id'],
+        {'item': {'name': 'Renamed'}}
+    )
+    assert updated['data']['name'] == 'Renamed'
+
+    assert client.delete('defects', created['id']) is True
+    assert created['id'] not in server.data.resources['defects']
+
+
+def test_set_api_version(client, server):
+    client.set_api_version(3)
+    client.get('me')
+    assert server.requests[-1] == ('GET', '/api/v3/me')
+
+
+def test_set_unsupported_api_version(client):
+    with pytest.raises(LookupError):
+        client.set_api_version(2)
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_rejected_token(kind, make_client):
+    client = make_client(kind, token='revoked')
+    with pytest.raises(AuthenticationError):
+        client.get('me')
+    assert not client.is_authenticated()
+
+
+@pytest.mark.parametrize('kind', KINDS)
+def test_authenticate_by_password(kind, make_client):
+    client = make_client(kind, token=None)
+    assert not client.is_authenticated()
+    assert client.authenticate_by_password('user', 'password')
+    assert client.get('me')['data']['id'] == 1
+
+
+def test_retries_server_errors(client, server):
+    server.inject(503, count=2)
+    assert client.get('defects', 1)['data']['id'] == 1
+    assert len(server.requests) == 3
+
+
+def test_does_not_retry_creates(client, server):
+    server.inject(503)
+    with pytest.raises(ValueError):
+        client.create('defects', {'item': {'name': 'New'}})
+    assert len(server.requests) == 1
+
+
+def test_html_gateway_error_raises_server_error(client, server):
+    server.inject(
+        503,
+        count=4,
+        body='<html><body>Service Unavailable</body></html>',
+        content_type='text/html'
+    )
+    with pytest.raises(ServerError):
+        client.get('me')
@@ -0,0 +1,155 @@
+"""
+Journal.
+
+The write queue against the stand-in.
+"""
+import threading
+import time
+
+import pytest
+
+from axosoft_api import AuthenticationError
+from axosoft_api.executor import Executor
+from axosoft_api.journal import WriteQueue
+
+GATEWAY_ERROR = '<html><body><h1>502 Bad Gateway</h1></body></html>'
+
+
+def test_writes_survive_a_restart(make_client, tmpdir):
+    path = str(tmpdir.join('journal'))
+    queue = WriteQueue(make_client(), path)
+    queue.create('defects', {'item': {'name': 'New'}})
+    queue.delete('defects', 1)
+    assert len(WriteQueue(make_client(), path)) == 2
+
+
+def test_flush_sends_writes_in_order(make_client, server, tmpdir):
+    path = str(tmpdir.join('journal'))
+    queue = WriteQueue(make_client(), path)
+    queue.update('defects', 1, {'item': {'name': 'First'}})
+    queue.update('defects', 1, {'item': {'name': 'Second'}})
+
+    finished = queue.flush()
+    assert [result.success for _, result in finished] == [True, True]
+    assert server.data.resources['defects'][1]['name'] == 'Second'
+    assert len(queue) == 0
+    assert len(WriteQueue(make_client(), path)) == 0
+
+
+def test_gateway_errors_keep_writes_queued(make_client, server, tmpdir):
+    queue = WriteQueue(make_client(), str(tmpdir.join('journal')))
+    queue.create('defects', {'item': {'name': 'New'}})
+
+    server.inject(502, body=GATEWAY_ERROR, content_type='text/html')
+    assert queue.flush() == []
+    assert len(queue) == 1
+    assert queue.retry_delay() is not None
+
+    finished = queue.flush()
+    assert [result.success for _, result in finished] == [True]
+    assert len(queue) == 0
+
+
+def test_rejected_writes_are_dropped(make_client, tmpdir):
+    queue = WriteQueue(make_client(), str(tmpdir.join('journal')))
+    queue.update('defects', 999999, {'item': {'name': 'Gone'}})
+
+    finished = queue.flush()
+    assert [result.success for _, result in finished] == [False]
+    assert len(queue) == 0
+
+
+def test_clear_drops_pending_writes(make_client, tmpdir):
+    path = str(tmpdir.join('journal'))
+    queue = WriteQueue(make_client(), path)
+    queue.delete('defects', 1)
+
+    queue.clear()
+    assert len(queue) == 0
+    assert queue.flush() == []
+    assert len(WriteQueue(make_client(), path)) == 0
+
+
+def test_writes_go_through_the_current_client(make_client, server, tmpdir):
+    queue = WriteQueue(make_client(token='revoked'), str(tmpdir.join('j')))
+    queue.update('defects', 1, {'item': {'name': 'Mine'}})
+
+    queue.set_client(make_client())
+    assert [result.success for _, result in queue.flush()] == [True]
+    assert server.data.resources['defects'][1]['name'] == 'Mine'
+
+
+class Recorder(object):
+
+    """ A client noting which writes were sent at the same time. """
+
+    def __init__(self, reject=None):
+        """ Init. """
+        self.lock = threading.Lock()
+        self.running = []
+        self.overlaps = []
+        self.reject = reject
+
+    def __call(self, name):
+        """ One write, taking a little while. """
+        with self.lock:
+            self.overlaps += [(x, name) for x in self.running]
+            self.running.append(name)
+        time.sleep(0.02)
+        with self.lock:
+            self.running.remove(name)
+        if name == self.reject:
+            raise AuthenticationError('Rejected')
+        return {'data': {'id': 1}}
+
+    def create(self, address, payload, idempotency_key=None):
+        """ Create. """
+        return self.__call(payload.get('name', address))
+
+    def update(self, address, resource_id, payload, idempotency_key=None):
+        """ Update. """
+        return self.__call(payload['name'])
+
+    def delete(self, address, resource_id, idempotency_key=None):
+        """ Delete. """
+        return self.__call('delete {0}'.format(resource_id))
+
+
+def test_writes_referring_to_an_item_are_not_batched_with_it(tmpdir):
+    client = Recorder()
+    queue = WriteQueue(client, str(tmpdir.join('journal')), Executor(4))
+    queue.create('work_logs', {
+        'name': 'log',
+        'user': {'id': 2},
+        'work_done': {'duration': 1},
+        'item': {'id': 2, 'item_type': 'defects'},
+        'date_time': '2026-01-01'
+    })
+    queue.delete('defects', 2)
+    queue.update('defects', 3, {'name': 'other'})
+
+    assert len(queue.flush()) == 3
+    assert client.overlaps == [('delete 2', 'other')]
+
+
+def test_flush_on_its_own_executor(make_client, tmpdir):
+    executor = Executor(1)
+    queue = WriteQueue(make_client(), str(tmpdir.join('journal')), executor)
+    queue.update('defects', 1, {'item': {'name': 'First'}})
+    queue.update('defects', 2, {'item': {'name': 'Second'}})
+
+    finished = executor.submit(queue.flush).result(5)
+    assert [result.success for _, result in finished] == [True, True]
+    executor.shutdown()
+
+
+def test_finished_writes_are_reported_before_a_rejection(tmpdir):
+    queue = WriteQueue(Recorder(reject='delete 2'), str(tmpdir.join('j')))
+    queue.delete('defects', 1)
+    queue.delete('defects', 2)
+    reported = []
+
+    with pytest.raises(AuthenticationError):
+        queue.flush(on_finished=reported.append)
+    assert [write['resource_id'] for write, _ in reported[0]] == [1]
+    assert len(queue) == 1
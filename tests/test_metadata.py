@@ -0,0 +1,63 @@
+"""
+Metadata.
+
+The persisted reference data cache.
+"""
+import threading
+
+import pytest
+
+from axosoft_api import AuthenticationError
+from axosoft_api.metadata import MetadataCache
+
+
+def test_concurrent_refreshes_save_a_valid_file(make_client, server, tmpdir):
+    path = str(tmpdir.join('metadata.json'))
+    cache = MetadataCache(make_client(), path, server.domain)
+    errors = []
+
+    def refresh():
+        """ Refresh everything a few times. """
+        try:
+            for _ in range(5):
+                cache.refresh(['me', 'projects'], force=True)
+        except Exception as error:  # pylint: disable=W0703
+            errors.append(error)
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    loaded = MetadataCache(make_client(), path, server.domain)
+    assert loaded.me()['id'] == 1
+    assert len(loaded.projects()) == 5
+
+
+def test_clear_removes_the_file(make_client, server, tmpdir):
+    path = tmpdir.join('metadata.json')
+    cache = MetadataCache(make_client(), str(path), server.domain)
+    cache.refresh(['me'])
+    assert path.check()
+
+    cache.clear()
+    assert not path.check()
+    assert cache.me() is None
+
+
+def test_fetch_without_a_token_raises(make_client, server, tmpdir):
+    path = str(tmpdir.join('metadata.json'))
+    cache = MetadataCache(make_client(token=None), path, server.domain)
+    with pytest.raises(AuthenticationError):
+        cache.fetch('me')
+    assert server.requests == []
+
+
+def test_fetch(make_client, server, tmpdir):
+    path = str(tmpdir.join('metadata.json'))
+    cache = MetadataCache(make_client(), path, server.domain)
+    assert cache.fetch('me')['id'] == 1
+    assert cache.fetch('me')['id'] == 1
+    assert len(server.requests) == 1
@@ -0,0 +1,97 @@
+"""
+Refresh.
+
+Refreshing tokens against the stand-in's OAuth endpoint.
+"""
+import threading
+import time
+
+import pytest
+
+from axosoft_api import AuthenticationError, ServerError
+
+
+@pytest.fixture
+def make_refreshing(server, make_client):
+    """ Build clients holding a token and its refresh token. """
+    def make(lifetime=3600, **kwargs):
+        """ A client whose token expires after lifetime seconds. """
+        token = server.issue_token()
+        return make_client(
+            token=token['access_token'],
+            refresh_token=token['refresh_token'],
+            token_expires=time.time() + lifetime,
+            **kwargs
+        )
+    return make
+
+
+def refreshes(server):
+    """ Number of requests the stand-in's token endpoint received. """
+    return len([x for x in server.requests if x[1].endswith('/oauth2/token')])
+
+
+def test_concurrent_refreshes_are_serialised(make_refreshing, server):
+    stored = []
+    client = make_refreshing(lifetime=0, on_token=stored.append)
+    results = {}
+
+    def get(item_id):
+        """ Get an item with the expired token. """
+        results[item_id] = client.get('defects', item_id)['data']['id']
+
+    threads = [
+        threading.Thread(target=get, args=(x,)) for x in range(1, 9)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The stand-in revokes a refresh token once used, a second refresh
+    # would have been rejected
+    assert results == dict((x, x) for x in range(1, 9))
+    assert refreshes(server) == 1
+    assert len(stored) == 1
+
+
+def test_rejected_token_is_refreshed_and_retried(make_refreshing, server):
+    client = make_refreshing()
+    before = client.credentials()
+    server.data.tokens.clear()
+
+    assert client.get('me')['data']['id'] == 1
+    assert [x[0] for x in server.requests] == ['GET', 'POST', 'GET']
+    assert refreshes(server) == 1
+    assert client.credentials()['access_token'] != before['access_token']
+
+
+def test_failed_refresh_keeps_the_refresh_token(make_refreshing, server):
+    client = make_refreshing()
+    before = client.credentials()
+
+    server.inject(502, body='<html>Bad Gateway</html>',
+                  content_type='text/html')
+    with pytest.raises(ServerError):
+        client.refresh()
+    assert client.credentials() == before
+
+    client.refresh()
+    assert client.credentials()['access_token'] != before['access_token']
+    assert client.get('me')['data']['id'] == 1
+
+
+def test_rejected_refresh_forgets_the_tokens(make_refreshing, server):
+    stored = []
+    client = make_refreshing(on_token=stored.append)
+    server.data.refresh_tokens.clear()
+
+    with pytest.raises(AuthenticationError):
+        client.refresh()
+    assert client.credentials() == {
+        'access_token': None,
+        'refresh_token': None,
+        'expires': None
+    }
+    assert stored[-1]['refresh_token'] is None
+    assert not client.is_authenticated()
@@ -0,0 +1,89 @@
+"""
+Retry.
+
+Retries, timeouts and throttling of the blocking client against the
+stand-in's error injection.
+"""
+import time
+
+import pytest
+import requests
+
+from axosoft_api import ServerError
+from axosoft_api.retry import RetryPolicy, TokenBucket
+
+
+def test_server_errors_are_retried(make_client, server):
+    client = make_client()
+    server.inject(503, count=2)
+    assert client.get('defects', 1)['data']['id'] == 1
+    assert len(server.requests) == 3
+
+
+def test_retries_give_up(make_client, server):
+    client = make_client(retry=RetryPolicy(max_retries=2, backoff=0))
+    server.inject(500, count=5)
+    with pytest.raises(ServerError):
+        client.get('defects', 1)
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(make_client, server):
+    client = make_client()
+    with pytest.raises(ValueError):
+        client.get('defects', 999999)
+    assert len(server.requests) == 1
+
+
+def test_throttled_creates_are_retried(make_client, server):
+    client = make_client()
+    server.inject(429, headers={'Retry-After': '0'})
+    assert client.create('defects', {'item': {'name': 'New'}})['data']['id']
+    assert len(server.requests) == 2
+
+
+def test_retry_after_is_honoured(make_client, server):
+    client = make_client(retry=RetryPolicy(backoff=0))
+    server.inject(429, headers={'Retry-After': '1'})
+    started = time.time()
+    assert client.get('defects', 1)['data']['id'] == 1
+    assert time.time() - started >= 0.9
+    assert len(server.requests) == 2
+
+
+def test_timeouts_are_retried(make_client, server):
+    client = make_client(timeout=0.2)
+    server.inject(200, delay=1.0)
+    started = time.time()
+    assert client.get('defects', 1)['data']['id'] == 1
+    assert time.time() - started < 1.0
+    assert len(server.requests) == 2
+
+
+def test_timeouts_of_creates_are_raised(make_client, server):
+    client = make_client(timeout=0.2)
+    server.inject(201, delay=1.0)
+    with pytest.raises(requests.Timeout):
+        client.create('defects', {'item': {'name': 'New'}})
+    assert len(server.requests) == 1
+
+
+def test_rate_limiter_spaces_requests(make_client, server):
+    client = make_client(rate_limiter=TokenBucket(20, capacity=1))
+    started = time.time()
+    for item_id in range(1, 7):
+        client.get('defects', item_id)
+    # The first request takes the only token, the other five wait for one
+    assert time.time() - started >= 5 / 20.0 * 0.9
+
+
+def test_rate_limiter_below_one_per_second():
+    bucket = TokenBucket(0.5)
+    started = time.time()
+    bucket.acquire()
+    assert time.time() - started < 0.1
+
+
+def test_rate_limiter_must_hold_a_token():
+    with pytest.raises(ValueError):
+        TokenBucket(0.5, capacity=0.5)
@@ -0,0 +1,90 @@
+"""
+Search.
+
+The local search index.
+"""
+import random
+import threading
+
+from axosoft_api.config import RESOURCES
+from axosoft_api.search import SearchIndex
+from benchmarks.standin import make_items
+
+
+def indexed(count=20):
+    """ An index of count defects. """
+    index = SearchIndex('defects')
+    items = list(make_items('defects', count, 50))
+    for item_id, item in enumerate(items, 1):
+        item['id'] = item_id
+        item['name'] = 'crash {0}'.format(item_id)
+    items[4]['description'] = 'The <b>parser</b> hangs'
+    items[6]['custom_fields'] = {'custom_1': 'parser'}
+    index.add(items)
+    return index
+
+
+def test_search_ranks_matches():
+    index = indexed()
+    assert [x['id'] for x in index.search('crash 5')] == [5]
+    assert sorted(x['id'] for x in index.search('pars')) == [5, 7]
+
+
+def test_index_keeps_summaries():
+    index = indexed()
+    for item in index.search('crash', 5):
+        assert set(item) <= set(RESOURCES['defects']['columns'])
+        assert 'description' not in item
+        assert 'custom_fields' not in item
+
+
+def test_remove():
+    index = indexed()
+    index.remove([5])
+    assert [x['id'] for x in index.search('parser')] == [7]
+    assert len(index) == 19
+
+
+def test_top_results_match_a_full_ranking():
+    rand = random.Random(7)
+    words = ['{0}{1}'.format(x, y) for x in 'abcdef' for y in 'ghij']
+    words += ['a', 'b', 'ab']
+
+    def text(count):
+        """ Random words, repeats give some tokens higher weights. """
+        return ' '.join(rand.choice(words) for _ in range(count))
+
+    index = SearchIndex()
+    index.add([
+        {
+            'id': item_id,
+            'name': text(rand.randint(1, 3)),
+            'description': text(rand.randint(0, 12)),
+            'custom_fields': {'custom_1': rand.choice(words)}
+        }
+        for item_id in range(1, 3001)
+    ])
+    queries = ['a', 'ag', 'b', 'ag bh', 'ag b', 'a a', 'ci dj e', 'ab a']
+    queries += [text(rand.randint(1, 3)) for _ in range(50)]
+    for query in queries:
+        ranked = [x['id'] for x in index.search(query)]
+        for limit in (1, 10, 50):
+            top = [x['id'] for x in index.search(query, limit)]
+            assert top == ranked[:limit], query
+
+
+def test_stale_while_building():
+    index = SearchIndex('defects')
+    items = list(make_items('defects', 5000, 50))
+    for item_id, item in enumerate(items, 1):
+        item['id'] = item_id
+    building = threading.Thread(target=index.add, args=(items,))
+    building.start()
+    checks = 0
+    while building.is_alive():
+        # Must not fail on the half built index
+        index.stale(600)
+        checks += 1
+    building.join()
+    assert checks
+    assert not index.stale(600)
@@ -0,0 +1,96 @@
+"""
+Store.
+
+The local SQLite mirror of items.
+"""
+import json
+import sqlite3
+
+from axosoft_api.config import RESOURCES
+from axosoft_api.store import ItemStore
+from benchmarks.standin import UPDATED_FIELD, make_items
+
+
+ITEMS = 20
+
+
+def stored(path, count=10):
+    """ A store holding count defects. """
+    store = ItemStore(path)
+    items = list(make_items('defects', count, 100))
+    for item_id, item in enumerate(items, 1):
+        item['id'] = item_id
+        item['name'] = 'crash {0}'.format(item_id)
+    store.put('defects', items)
+    return store
+
+
+def test_items_are_limited(tmpdir):
+    store = stored(str(tmpdir.join('store')))
+    items = store.items('defects', search='crash', limit=3)
+    assert [x['id'] for x in items] == [1, 2, 3]
+
+
+def test_items_as_summaries(tmpdir):
+    store = stored(str(tmpdir.join('store')))
+    for item in store.items('defects', summaries=True):
+        assert set(item) <= set(RESOURCES['defects']['columns'])
+        assert 'description' not in item
+    assert 'description' in store.items('defects')[0]
+
+
+def test_stores_without_summaries_are_upgraded(tmpdir):
+    path = str(tmpdir.join('store'))
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(
+            'CREATE TABLE items (item_type TEXT, id INTEGER, name TEXT, '
+            'assigned_to_id INTEGER, updated TEXT, data TEXT, '
+            'PRIMARY KEY (item_type, id))'
+        )
+        connection.execute(
+            'INSERT INTO items VALUES (?, ?, ?, ?, ?, ?)',
+            ('defects', 1, 'Old', None, None,
+             json.dumps({'id': 1, 'name': 'Old', 'description': 'Long'}))
+        )
+    connection.close()
+
+    store = ItemStore(path)
+    assert store.items('defects', summaries=True) == [{'id': 1, 'name': 'Old'}]
+    store.put('defects', [{'id': 2, 'name': 'New', 'description': 'Long'}])
+    assert len(store.items('defects', summaries=True)) == 2
+
+
+def test_sync_fetches_only_changed_items(make_client, server, tmpdir):
+    store = ItemStore(str(tmpdir.join('store')))
+    client = make_client()
+    assert store.sync(client, 'defects', page_size=7) == ITEMS
+    assert len(store.items('defects')) == ITEMS
+    newest = max(
+        store.items('defects'),
+        key=lambda x: x[UPDATED_FIELD]
+    )['id']
+
+    received = []
+    store.sync(client, 'defects', on_items=received.extend)
+    assert [x['id'] for x in received] == [newest]
+
+    client.update('defects', 3, {'item': {'name': 'Changed'}})
+    del received[:]
+    store.sync(client, 'defects', on_items=received.extend)
+    assert sorted(x['id'] for x in received) == sorted([newest, 3])
+    assert store.items('defects', search='3')[0]['name'] == 'Changed'
+
+
+def test_sync_keeps_items_updated_with_the_newest(make_client, server,
+                                                 tmpdir):
+    store = ItemStore(str(tmpdir.join('store')))
+    client = make_client()
+    store.sync(client, 'defects')
+
+    # Updated in the same second as the newest item already stored
+    with server.data.lock:
+        late = server.data.add('defects', {'name': 'Late'})
+        late[UPDATED_FIELD] = store.watermark('defects')
+    store.sync(client, 'defects')
+    assert store.items('defects', search='Late')[0]['id'] == late['id']